@@ -1,29 +1,86 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from config.env import Config
-from config.db import connect_db
+from config.db import db_status
+from middlewares.device_auth import valid_api_key
+from models.Model import Model
+from services.auth_cache import auth_cache
+from services.email_outbox import email_outbox
+from services.sms_dispatcher import sms_dispatcher
+from services.session_registry import session_registry
+from services.coordinate_buffer import coordinate_buffer
+from utils.json_provider import BSONJSONProvider
+from utils.static_manifest import StaticManifest
 from routes.auth_routes import auth_bp
 from routes.device_routes import device_bp
 from routes.session_routes import session_bp
 from routes.user_routes import user_bp
 import os
+import sys
 import json
 import datetime
+import click
+
+def print_index_report(reports, verbose=False):
+    for collection, report in reports.items():
+        for key in ('created', 'missing', 'extra', 'dropped', 'conflicts', 'errors'):
+            for name in report[key]:
+                print(f'[indexes] {collection}: {key} {name}')
+        if verbose and not any(report.values()):
+            print(f'[indexes] {collection}: in sync')
 
 def create_app():
     # In Docker, we copy the build folder to /app/build, so it's a sibling of app.py
     app = Flask(__name__, static_folder='build')
+    # ObjectId, datetime and Decimal128 straight from documents; orjson when installed
+    app.json = BSONJSONProvider(app)
     CORS(app)
 
-    # Connect to MongoDB
-    connect_db()
-
     # Register Blueprints
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(device_bp, url_prefix='/api/device')
     app.register_blueprint(session_bp, url_prefix='/api/sessions')
     app.register_blueprint(user_bp, url_prefix='/api/user')
 
+    # The MongoDB client is created on first use in each process
+    # (config/db.py). A failed connection leaves the app up and reported as
+    # not ready by /health. Collections, indexes and the session registry
+    # are set up once per deploy, not by every worker:
+    #
+    #   flask --app app:create_app sync-indexes
+    #   flask --app app:create_app rebuild-session-registry
+    #
+    # SYNC_INDEXES_ON_STARTUP=true still syncs at boot, for development.
+
+    # Models register themselves on import, so this runs after the blueprints
+    if Config.SYNC_INDEXES_ON_STARTUP:
+        try:
+            print_index_report(Model.sync_all_indexes())
+        except Exception as e:
+            print(f'Index sync failed: {e}')
+
+    # Background senders belong to serving processes, not to a one-off
+    # `flask <command>` that would exit holding leases on queued messages
+    command = click.get_current_context(silent=True)
+    if command is None or command.info_name == 'run':
+        # Mail that was queued before a restart goes out without waiting for a new request
+        if Config.EMAIL_DELIVERY == 'outbox':
+            email_outbox.start()
+
+        # Likewise emergency SMS whose worker died before sending them
+        sms_dispatcher.start()
+
+    @app.cli.command('sync-indexes')
+    @click.option('--dry-run', is_flag=True, help='Only report missing and extra indexes.')
+    @click.option('--drop-extra', is_flag=True, help='Drop indexes that no model declares.')
+    def sync_indexes_command(dry_run, drop_extra):
+        print_index_report(Model.sync_all_indexes(drop_extra=drop_extra, dry_run=dry_run), verbose=True)
+
+    @app.cli.command('rebuild-session-registry')
+    def rebuild_session_registry_command():
+        # Sessions started before the registry existed, or by an older deploy
+        print(f'[registry] {session_registry.rebuild()} active sessions added')
+
     # Emergency file endpoints
     # To mimic node __dirname behavior
     # Assuming app.py is in python-dev/
@@ -58,21 +115,37 @@ def create_app():
             print(f'File read error: {e}')
             return jsonify({'error': str(e)}), 500
 
+    # React build, indexed once per process (ETags, precompressed variants)
+    static_manifest = StaticManifest(app.static_folder, max_age=Config.STATIC_MAX_AGE_SECONDS, immutable_max_age=Config.STATIC_IMMUTABLE_MAX_AGE_SECONDS)
+
     @app.route('/', defaults={'path': ''})
     @app.route('/<path:path>')
     def serve(path):
-        if path != "" and os.path.exists(app.static_folder + '/' + path):
-            return app.send_static_file(path)
-        else:
-            return app.send_static_file('index.html')
+        return static_manifest.send(path)
 
     @app.route('/health', methods=['GET'])
     def health_check():
-        return jsonify({
-            'status': 'ok',
-            'timestamp': str(datetime.datetime.now()), # datetime needed
-            'environment': Config.NODE_ENV
-        })
+        # Public probe: status only. Connection errors go to the log, and the
+        # metrics are shown to callers with the API key.
+        database = db_status(max_age=Config.MONGO_HEALTH_CHECK_SECONDS)
+        if database['error'] and database['error'] != getattr(health_check, 'logged_error', None):
+            print(f"Health check: MongoDB unavailable: {database['error']}", file=sys.stderr)
+        health_check.logged_error = database['error']
+
+        body = {
+            'status': 'ok' if database['ready'] else 'unavailable',
+            'timestamp': str(datetime.datetime.now()) # datetime needed
+        }
+        if valid_api_key(request.headers.get('x-api-key')):
+            body.update({
+                'environment': Config.NODE_ENV,
+                'database': database,
+                'authCache': auth_cache.stats(),
+                'emailOutbox': email_outbox.metrics(),
+                'sessionRegistry': session_registry.stats(),
+                'coordinateBuffer': coordinate_buffer.metrics()
+            })
+        return jsonify(body), 200 if database['ready'] else 503
 
     @app.errorhandler(404)
     def page_not_found(e):
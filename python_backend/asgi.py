@@ -0,0 +1,158 @@
+# Optional asyncio serving mode:
+#
+#   uvicorn asgi:app --host 0.0.0.0 --port 5000
+#
+# The device ingestion routes (coordinates/add and coordinates/batch under
+# /api/device and /api/sessions) are served natively on the event loop with
+# the AsyncMongoClient, so one process can hold thousands of concurrent
+# device connections. Every other route is the unchanged Flask app from
+# create_app(), run on a thread pool of ASGI_WSGI_THREADS.
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from app import create_app
+from config.env import Config
+from controllers import session_controller
+from middlewares.device_auth import valid_api_key
+from models.Device import Device
+from models.TriggerSession import TriggerSession
+from services.location_broker import location_broker
+from services.session_registry import session_registry
+from utils.api_error import ApiError
+
+class ThreadedWsgiInstance(WsgiToAsgiInstance):
+    # WsgiToAsgi runs every request on one shared thread (thread_sensitive),
+    # so a single live-location stream would hold up all the others. This
+    # re-wraps asgiref's own run_wsgi_app, which is why requirements-async.txt
+    # pins asgiref to a minor version.
+    executor = ThreadPoolExecutor(max_workers=Config.ASGI_WSGI_THREADS, thread_name_prefix='wsgi')
+    run_wsgi_app = sync_to_async(WsgiToAsgiInstance.__dict__['run_wsgi_app'].func, thread_sensitive=False, executor=executor)
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await ThreadedWsgiInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+async def _active_session(device_id, action):
+    # Async _with_active_session: a warm registry entry costs no thread hop
+    for _ in range(2):
+        entry = session_registry.cached(device_id) or await asyncio.to_thread(session_registry.get, device_id)
+        if not entry:
+            break
+        result = await action(entry)
+        if result is not None:
+            return result
+        session_registry.invalidate(device_id)
+    raise ApiError(404, 'No active session found for device')
+
+async def _append_coordinates(device_id, new_coordinates, deduplicate=True):
+    if Config.INGEST_MODE == 'buffered':
+        return await asyncio.to_thread(session_controller._append_coordinates, device_id, new_coordinates)
+
+    async def append(entry):
+        session = TriggerSession._from_document({"_id": entry['sessionId'], "deviceId": device_id, "userId": entry.get('userId')})
+        return await TriggerSession.arecord_coordinates(session, new_coordinates, deduplicate=deduplicate)
+
+    session = await _active_session(device_id, append)
+
+    await Device.afindOneAndUpdate({"deviceId": device_id}, {"$set": {"lastActive": datetime.utcnow()}}, projection={"_id": 1}, lean=True)
+    location_broker.publish(session._id)
+
+    return session._id, session.coordinates_count()
+
+async def add_coordinates(data):
+    device_id, new_coordinates = session_controller._single_fix(data)
+    session_id, coordinates_count = await _append_coordinates(device_id, new_coordinates, deduplicate=False)
+    return session_controller._coordinates_added(session_id, coordinates_count, new_coordinates)
+
+async def add_coordinates_batch(data):
+    device_id, new_coordinates = session_controller._batch_fixes(data)
+    session_id, coordinates_count = await _append_coordinates(device_id, new_coordinates, session_controller._may_repeat(data))
+    return session_controller._coordinates_added(session_id, coordinates_count, new_coordinates, batch=True)
+
+# Same URLs as routes/device_routes.py and routes/session_routes.py
+NATIVE_ROUTES = {
+    '/api/device/coordinates/add': add_coordinates,
+    '/api/sessions/coordinates': add_coordinates,
+    '/api/device/coordinates/batch': add_coordinates_batch,
+    '/api/sessions/coordinates/batch': add_coordinates_batch
+}
+
+class AsyncApp:
+    def __init__(self):
+        self.flask_app = None
+        self.fallback = None
+        self._startup = None
+
+    async def _ensure_started(self):
+        # create_app() connects to MongoDB and rebuilds the registry; run it
+        # once, off the loop, at lifespan startup or on the first request
+        if self._startup is None:
+            self._startup = asyncio.ensure_future(asyncio.to_thread(create_app))
+        if self.flask_app is None:
+            self.flask_app = await self._startup
+            self.fallback = ThreadedWsgiToAsgi(self.flask_app)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+
+        await self._ensure_started()
+        handler = NATIVE_ROUTES.get(scope['path'].rstrip('/')) if scope['type'] == 'http' and scope['method'] == 'POST' else None
+        if handler is None:
+            return await self.fallback(scope, receive, send)
+
+        status, body = await self._handle(handler, scope, receive)
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"access-control-allow-origin", b"*")]
+        })
+        await send({"type": "http.response.body", "body": body.encode()})
+
+    async def _handle(self, handler, scope, receive):
+        # Same envelopes and status codes as device_auth_required and the
+        # session controller
+        dumps = self.flask_app.json.dumps
+        try:
+            headers = dict(scope['headers'])
+            api_key = headers.get(b'x-api-key', b'').decode('latin-1')
+            if not valid_api_key(api_key):
+                raise ApiError(401, 'Invalid API key')
+
+            chunks = []
+            while True:
+                message = await receive()
+                chunks.append(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            try:
+                data = self.flask_app.json.loads(b''.join(chunks) or b'{}')
+            except ValueError:
+                raise ApiError(400, 'Request body must be JSON')
+            if not isinstance(data, dict):
+                raise ApiError(400, 'Request body must be a JSON object')
+
+            return 200, dumps({"success": True, "message": "Success", "data": await handler(data)})
+
+        except ApiError as e:
+            return e.status_code, dumps({"success": False, "message": e.message})
+        except Exception as error:
+            return 500, dumps({"success": False, "message": str(error)})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self._ensure_started()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+app = AsyncApp()
@@ -0,0 +1,53 @@
+import sys
+import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.password_service import PasswordHasher
+from utils import passwords
+
+# Login throughput at different bcrypt pool sizes. Request threads (like
+# gunicorn gthread workers) verify a password concurrently; 0 = inline.
+#
+#   python bench_login.py --pool-sizes 0,1,2,4 --threads 16 --logins 200
+
+def bench(pool_size, rounds, threads, logins):
+    hasher = PasswordHasher(rounds=rounds, pool_size=pool_size, queue_size=threads, queue_timeout=60)
+    stored = passwords.hash_password('correct horse battery', rounds)
+    # Warm up so process start-up isn't counted
+    for _ in range(max(pool_size, 1)):
+        hasher.verify('correct horse battery', stored)
+
+    latencies = []
+    def login(_):
+        started = time.perf_counter()
+        hasher.verify('correct horse battery', stored)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+
+    latencies.sort()
+    return {
+        "poolSize": pool_size,
+        "loginsPerSecond": round(logins / elapsed, 1),
+        "p50Ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p95Ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1)
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pool-sizes', default=f'0,1,2,{os.cpu_count() or 4}')
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=200)
+    args = parser.parse_args()
+
+    for size in [int(s) for s in args.pool_sizes.split(',')]:
+        print(bench(size, args.rounds, args.threads, args.logins))
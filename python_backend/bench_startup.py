@@ -0,0 +1,76 @@
+import sys
+import os
+import json
+import argparse
+import subprocess
+
+# Cold-start time of a worker: `import app` and `create_app()`, each run in
+# a fresh interpreter. Exits 1 when the median exceeds its budget or when a
+# module that should load lazily (provider SDKs) was imported at startup.
+#
+#   python bench_startup.py --runs 5 --import-budget-ms 600 --startup-budget-ms 1500
+#
+# create_app() connects to MONGODB_URI (index sync, registry rebuild); use
+# --import-only where no database is reachable.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PROBE = '''
+import json, os, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+if os.environ.get('BENCH_CREATE_APP') == '1':
+    app.create_app()
+created = time.perf_counter()
+print(json.dumps({
+    "importMs": (imported - started) * 1000,
+    "startupMs": (created - started) * 1000,
+    "modules": sorted(m for m in sys.modules if '.' not in m)
+}))
+'''
+
+def probe(create_app):
+    env = dict(os.environ, BENCH_CREATE_APP='1' if create_app else '0')
+    result = subprocess.run([sys.executable, '-c', PROBE], cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True)
+    # create_app() logs to stdout; the measurement is the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+def bench(runs, create_app):
+    samples = [probe(create_app) for _ in range(runs)]
+    loaded = set().union(*(s["modules"] for s in samples))
+    return {
+        "runs": runs,
+        "importMs": round(median([s["importMs"] for s in samples]), 1),
+        "startupMs": round(median([s["startupMs"] for s in samples]), 1) if create_app else None,
+        "loaded": loaded
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--import-budget-ms', type=float, default=600)
+    parser.add_argument('--startup-budget-ms', type=float, default=1500)
+    parser.add_argument('--import-only', action='store_true', help='Skip create_app(), no database needed.')
+    parser.add_argument('--lazy-modules', default='twilio,resend,requests', help='Modules that must not be imported at startup.')
+    args = parser.parse_args()
+
+    result = bench(args.runs, not args.import_only)
+    eager = sorted(set(filter(None, args.lazy_modules.split(','))) & result.pop("loaded"))
+    print(dict(result, eagerModules=eager))
+
+    failures = []
+    if result["importMs"] > args.import_budget_ms:
+        failures.append(f'import app took {result["importMs"]}ms (budget {args.import_budget_ms}ms)')
+    if result["startupMs"] is not None and result["startupMs"] > args.startup_budget_ms:
+        failures.append(f'create_app took {result["startupMs"]}ms (budget {args.startup_budget_ms}ms)')
+    if eager:
+        failures.append(f'imported at startup: {", ".join(eager)}')
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,16 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.static_manifest import precompress
+
+# Writes .gz/.br variants of the React build's text assets, which
+# StaticManifest serves to clients that accept them. Run after the build
+# is copied in (see Dockerfile):
+#
+#   python compress_static.py build
+
+if __name__ == "__main__":
+    root = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'build')
+    print(f"Wrote {precompress(root)} precompressed files under {root}")
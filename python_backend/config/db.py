@@ -1,48 +1,103 @@
 
 from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, OperationFailure
 from .env import Config
+from datetime import datetime
+import os
 import sys
+import threading
 
-# Global client and database variables
+# Clients are created lazily, once per process: a MongoClient must not be
+# shared across fork() (gunicorn --preload), so the after-fork hook below
+# drops the parent's and the child builds its own on first use.
 client = None
 db = None
+_pid = None
+# AsyncMongoClient for asgi.py, created on first use in each process
+async_client = None
+_async_pid = None
+# Held while a client is created, so concurrent first requests share one
+_lock = threading.Lock()
+# Outcome of the last connection check, reported by /health
+_status = {"ready": False, "error": None, "checkedAt": None}
+
+def _client_options(max_pool_size):
+    return dict(
+        serverSelectionTimeoutMS=Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=Config.MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=Config.MONGO_SOCKET_TIMEOUT_MS,
+        maxPoolSize=max_pool_size,
+        minPoolSize=min(Config.MONGO_MIN_POOL_SIZE, max_pool_size)
+    )
 
 def get_db():
+    global client, db, _pid
+    if db is None or _pid != os.getpid():
+        with _lock:
+            if db is None or _pid != os.getpid():
+                # connect=False: no monitor threads or sockets until the first operation
+                client = MongoClient(Config.MONGODB_URI, connect=False, **_client_options(Config.MONGO_MAX_POOL_SIZE))
+                db = client.get_database()
+                _pid = os.getpid()
     return db
 
-def connect_db():
-    global client, db
+def get_async_db():
+    global async_client, _async_pid
+    if async_client is None or _async_pid != os.getpid():
+        with _lock:
+            if async_client is None or _async_pid != os.getpid():
+                from pymongo import AsyncMongoClient
+                async_client = AsyncMongoClient(Config.MONGODB_URI, **_client_options(Config.MONGO_ASYNC_MAX_POOL_SIZE))
+                _async_pid = os.getpid()
+    return async_client.get_database()
+
+def _reset_after_fork():
+    # The parent's clients (and their sockets) belong to the parent; never
+    # close them from here
+    global client, db, _pid, async_client, _async_pid, _lock
+    # A thread of the parent may have held the lock at fork time
+    _lock = threading.Lock()
+    client = db = _pid = None
+    async_client = _async_pid = None
+    _status.update(ready=False, error=None, checkedAt=None)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def _check():
     try:
-        # Pymongo doesn't have strictQuery, it's specific to Mongoose schemas.
-        # We configure the client with the same timeouts and pool sizes.
-        client = MongoClient(
-            Config.MONGODB_URI,
-            serverSelectionTimeoutMS=5000,
-            maxPoolSize=10,
-            minPoolSize=2,
-            socketTimeoutMS=45000
-        )
-        
-        # Verify connection immediately to catch errors early
-        client.admin.command('ping')
+        get_db().client.admin.command('ping')
+        _status.update(ready=True, error=None, checkedAt=datetime.utcnow())
+    except Exception as err:
+        _status.update(ready=False, error=str(err), checkedAt=datetime.utcnow())
+    return _status["ready"]
+
+def connect_db():
+    # Pings the server and records the outcome for db_status(). Returns
+    # whether MongoDB is reachable; callers decide whether that is fatal.
+    if _check():
         print('✓ MongoDB connected successfully')
-        
-        # Select database
-        db = client.get_database() 
-        
-    except (ConnectionFailure, OperationFailure) as err:
-        print(f'MongoDB connection error: {err}', file=sys.stderr)
-        sys.exit(1)
-    except Exception as e:
-        print(f'MongoDB connection error: {e}', file=sys.stderr)
-        sys.exit(1)
+    else:
+        print(f'MongoDB connection error: {_status["error"]}', file=sys.stderr)
+    return _status["ready"]
+
+def db_status(max_age=None):
+    # Readiness for /health; re-pings when the last check is older than
+    # max_age seconds (or has never run in this process)
+    checked_at = _status["checkedAt"]
+    if max_age is not None and (checked_at is None or (datetime.utcnow() - checked_at).total_seconds() > max_age):
+        _check()
+    return {
+        "ready": _status["ready"],
+        "error": _status["error"],
+        "checkedAt": _status["checkedAt"]
+    }
 
 def close_db():
-    global client
+    global client, db, _pid
     if client:
         client.close()
         print('MongoDB disconnected')
+    client = db = _pid = None
 
 # Note: Pymongo doesn't support event listeners for 'disconnected' or 'error' in the same way as Mongoose.
 # Connection monitoring would require implementing a custom Monitoring event listener if strictly needed.
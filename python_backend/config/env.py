@@ -6,9 +6,41 @@ load_dotenv()
 class Config:
     PORT = int(os.getenv('PORT', 5000))
     MONGODB_URI = os.getenv('MONGODB_URI')
+    MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 10))
+    # Connections each process opens up front; 0 opens them on demand
+    MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 10000))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', 45000))
+    # Seconds /health reuses a MongoDB ping result
+    MONGO_HEALTH_CHECK_SECONDS = int(os.getenv('MONGO_HEALTH_CHECK_SECONDS', 10))
+    # Connection pool of the AsyncMongoClient used by asgi.py
+    MONGO_ASYNC_MAX_POOL_SIZE = int(os.getenv('MONGO_ASYNC_MAX_POOL_SIZE', 100))
+    # Threads running the Flask routes that asgi.py doesn't serve natively
+    ASGI_WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', 32))
+
     JWT_SECRET = os.getenv('JWT_SECRET')
     JWT_EXPIRES_IN = os.getenv('JWT_EXPIRES_IN', '7d')
 
+    # Login token storage: 'mongo' (authtokens collection) or 'memory'
+    TOKEN_STORE = os.getenv('TOKEN_STORE', 'mongo')
+    # Keep accepting tokens still embedded in users.tokens until migrate_tokens.py has run
+    LEGACY_TOKEN_FALLBACK = os.getenv('LEGACY_TOKEN_FALLBACK', 'true').lower() == 'true'
+
+    # Device -> active session registry: 'mongo' (activesessions collection,
+    # shared by all workers) or 'memory', with a per-worker read-through cache
+    SESSION_REGISTRY = os.getenv('SESSION_REGISTRY', 'mongo')
+    SESSION_REGISTRY_CACHE_SECONDS = int(os.getenv('SESSION_REGISTRY_CACHE_SECONDS', 30))
+    SESSION_REGISTRY_CACHE_SIZE = int(os.getenv('SESSION_REGISTRY_CACHE_SIZE', 10000))
+
+    # Per-worker cache of authenticated principals (0 disables it)
+    AUTH_CACHE_TTL_SECONDS = int(os.getenv('AUTH_CACHE_TTL_SECONDS', 30))
+    AUTH_CACHE_MAX_SIZE = int(os.getenv('AUTH_CACHE_MAX_SIZE', 10000))
+    # Seconds a cached principal is trusted before its token is checked
+    # against the token store again; how long a revocation made on another
+    # worker can take to apply here (0 checks on every request)
+    AUTH_RECHECK_SECONDS = float(os.getenv('AUTH_RECHECK_SECONDS', 5))
+
     API_KEY = os.getenv('API_KEY')
     RESEND_API_KEY = os.getenv('RESEND_API_KEY')
     RESEND_FROM_NAME = os.getenv('RESEND_FROM_NAME', "MITR SOS")
@@ -16,10 +48,98 @@ class Config:
     RESEND_FROM_EMAIL = f"{RESEND_FROM_NAME} <{RESEND_FROM_ADDRESS}>"
 
     OTP_EXPIRY_MINUTES = int(os.getenv('OTP_EXPIRY_MINUTES', 10))
+
+    # Email delivery: 'outbox' (queued, background workers) or 'inline'
+    EMAIL_DELIVERY = os.getenv('EMAIL_DELIVERY', 'outbox')
+    EMAIL_WORKERS = int(os.getenv('EMAIL_WORKERS', 1))
+    EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 50))
+    EMAIL_POLL_INTERVAL_SECONDS = float(os.getenv('EMAIL_POLL_INTERVAL_SECONDS', 5))
+    EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', 5))
+    EMAIL_RETRY_BACKOFF_SECONDS = float(os.getenv('EMAIL_RETRY_BACKOFF_SECONDS', 5))
+    EMAIL_LEASE_SECONDS = int(os.getenv('EMAIL_LEASE_SECONDS', 60))
+
     NODE_ENV = os.getenv('NODE_ENV', 'development')
     DEVICE_DEFAULT_PASSWORD = os.getenv('DEVICE_DEFAULT_PASSWORD', 'default123')
 
+    # Password hashing: bcrypt cost factor (stored hashes with another cost are
+    # rehashed on the next successful login) and an optional hashing process
+    # pool. Off by default (0, hash on the request thread): bcrypt releases
+    # the GIL, so threads already hash in parallel and the pool only adds
+    # IPC; measure with bench_login.py before turning it on.
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+    BCRYPT_POOL_SIZE = int(os.getenv('BCRYPT_POOL_SIZE', 0))
+    BCRYPT_QUEUE_SIZE = int(os.getenv('BCRYPT_QUEUE_SIZE', 64))
+    BCRYPT_QUEUE_TIMEOUT_SECONDS = float(os.getenv('BCRYPT_QUEUE_TIMEOUT_SECONDS', 5))
+
+    # Create missing collections and indexes in every worker at boot
+    # (development); deploys run `flask sync-indexes` instead, see app.py
+    SYNC_INDEXES_ON_STARTUP = os.getenv('SYNC_INDEXES_ON_STARTUP', 'false').lower() == 'true'
+
+    # Coordinate ingestion
+    MAX_COORDINATES_BATCH = int(os.getenv('MAX_COORDINATES_BATCH', 500))
+
+    # Coordinate ingestion: 'sync' writes before replying, 'buffered' acknowledges
+    # right away and writes in bulk every INGEST_FLUSH_INTERVAL_MS or once a
+    # session has INGEST_FLUSH_SIZE fixes (see services/coordinate_buffer.py)
+    INGEST_MODE = os.getenv('INGEST_MODE', 'sync')
+    INGEST_FLUSH_INTERVAL_MS = int(os.getenv('INGEST_FLUSH_INTERVAL_MS', 1000))
+    INGEST_FLUSH_SIZE = int(os.getenv('INGEST_FLUSH_SIZE', 100))
+    INGEST_MAX_BUFFERED = int(os.getenv('INGEST_MAX_BUFFERED', 5000))
+
+    # Session history totals are cached per worker for this long
+    HISTORY_TOTAL_CACHE_SECONDS = int(os.getenv('HISTORY_TOTAL_CACHE_SECONDS', 30))
+
+    # Cache lifetime of front-end files; content-hashed ones (static/js/main.<hash>.js) are immutable
+    STATIC_MAX_AGE_SECONDS = int(os.getenv('STATIC_MAX_AGE_SECONDS', 3600))
+    STATIC_IMMUTABLE_MAX_AGE_SECONDS = int(os.getenv('STATIC_IMMUTABLE_MAX_AGE_SECONDS', 31536000))
+
+    # Live location stream (/api/sessions/<id>/stream). Streams end after
+    # SSE_MAX_STREAM_SECONDS; browsers reconnect and resume via Last-Event-ID
+    SSE_POLL_INTERVAL_SECONDS = float(os.getenv('SSE_POLL_INTERVAL_SECONDS', 2))
+    SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', 15))
+    SSE_MAX_STREAM_SECONDS = float(os.getenv('SSE_MAX_STREAM_SECONDS', 300))
+    # Open streams per worker process, each holding a thread: keep it well
+    # below gunicorn --threads (or ASGI_WSGI_THREADS); more get a 503
+    SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', 4))
+    # Lifetime of the ?token= stream tokens from POST /<id>/stream-token
+    SSE_TOKEN_SECONDS = int(os.getenv('SSE_TOKEN_SECONDS', 60))
+
+    # Per-worker cache of simplified tracks (?maxPoints / ?tolerance) of completed sessions
+    TRACK_CACHE_SECONDS = int(os.getenv('TRACK_CACHE_SECONDS', 600))
+    TRACK_CACHE_MAX_SIZE = int(os.getenv('TRACK_CACHE_MAX_SIZE', 256))
+
+    # 'columnar' packs a session's fixes into TriggerSession.coordinatesArchive
+    # when it stops and drops the per-fix documents; 'none' keeps them as is
+    COORDINATE_ARCHIVE_FORMAT = os.getenv('COORDINATE_ARCHIVE_FORMAT', 'none')
+
     # Twilio Configuration
     TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
     TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
     TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')
+
+    # Emergency SMS fan-out (SMS_WORKERS=0 sends inline)
+    SMS_WORKERS = int(os.getenv('SMS_WORKERS', 4))
+    SMS_QUEUE_SIZE = int(os.getenv('SMS_QUEUE_SIZE', 1000))
+    SMS_MAX_RETRIES = int(os.getenv('SMS_MAX_RETRIES', 2))
+    SMS_RETRY_BACKOFF_SECONDS = float(os.getenv('SMS_RETRY_BACKOFF_SECONDS', 1))
+    SMS_TIMEOUT_SECONDS = float(os.getenv('SMS_TIMEOUT_SECONDS', 10))
+    # Deliveries are claimed with a lease in TriggerSession.smsDeliveries; any
+    # worker re-sends those whose lease ran out (process restarted) every
+    # SMS_RECOVERY_INTERVAL_SECONDS, unless queued longer than SMS_MAX_AGE_SECONDS
+    SMS_LEASE_SECONDS = float(os.getenv('SMS_LEASE_SECONDS', 120))
+    SMS_RECOVERY_INTERVAL_SECONDS = float(os.getenv('SMS_RECOVERY_INTERVAL_SECONDS', 30))
+    SMS_MAX_AGE_SECONDS = float(os.getenv('SMS_MAX_AGE_SECONDS', 3600))
+    # Send through this HTTP endpoint instead of Twilio (e.g. a local fake)
+    SMS_GATEWAY_URL = os.getenv('SMS_GATEWAY_URL')
+    # Provider limits: messages per second per sender number (0 disables)
+    # and burst size, kept in SMS_RATE_LIMIT_STORE ('mongo' holds them
+    # across workers, 'memory' per process); and a ceiling on in-flight
+    # sends, divided between the WEB_CONCURRENCY worker processes
+    SMS_RATE_PER_SECOND = float(os.getenv('SMS_RATE_PER_SECOND', 1))
+    SMS_RATE_BURST = int(os.getenv('SMS_RATE_BURST', 5))
+    SMS_RATE_WAIT_SECONDS = float(os.getenv('SMS_RATE_WAIT_SECONDS', 60))
+    SMS_RATE_LIMIT_STORE = os.getenv('SMS_RATE_LIMIT_STORE', 'mongo')
+    SMS_MAX_CONCURRENCY = int(os.getenv('SMS_MAX_CONCURRENCY', 4))
+    # Worker processes per instance; gunicorn reads the same variable
+    WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+    SMS_HTTP_POOL_SIZE = int(os.getenv('SMS_HTTP_POOL_SIZE', 10))
@@ -5,6 +5,9 @@ import os
 from models.User import User
 from models.OTP import OTP
 from services import otp_service, token_service, email_service
+from services.email_outbox import email_outbox
+from services.auth_cache import auth_cache
+from services.token_store import token_store
 from utils.api_error import ApiError
 from utils.api_response import ApiResponse
 
@@ -31,7 +34,7 @@ def signup_initiate():
 
         existing_user = User.findOne({
             "$or": [{"userID": user_id}, {"email": email}]
-        })
+        }, projection={"_id": 1}, lean=True)
 
         if existing_user:
             return jsonify({
@@ -83,7 +86,7 @@ def signup_complete():
 
         existing_user = User.findOne({
             "$or": [{"userID": user_id}, {"email": email}]
-        })
+        }, projection={"_id": 1}, lean=True)
 
         if existing_user:
             raise ApiError(400, 'User already exists with this userID or email')
@@ -113,9 +116,7 @@ def signup_complete():
         user.save()
 
         token = token_service.generate_auth_token(user._id)
-        
-        user.tokens = getattr(user, 'tokens', []) + [{"token": token}]
-        user.save()
+        token_store.add(token, user._id)
 
         OTP.deleteOne({"_id": otp_record._id})
 
@@ -162,9 +163,7 @@ def login():
             raise ApiError(401, 'Invalid credentials')
 
         token = token_service.generate_auth_token(user._id)
-        
-        user.tokens = getattr(user, 'tokens', []) + [{"token": token}]
-        user.save()
+        token_store.add(token, user._id)
 
         return ApiResponse(200, {
             "user": {
@@ -200,10 +199,8 @@ def forgot_password():
         user.otpExpires = otp_expires
         user.save()
         
-        # email_service is sync/async? 
-        # email_service.send_password_reset_email is likely synchronous wrapper or we need to check
-        # Assuming sync for now or we just call it
-        email_service.send_password_reset_email(email, otp)
+        # Queued in the email outbox; the request doesn't wait on Resend
+        email_outbox.deliver('password_reset', email_service.build_password_reset_email(email, otp))
         
         return ApiResponse(200, {
              "message": 'Password reset OTP sent to email',
@@ -259,8 +256,8 @@ def logout():
         token = getattr(request, 'token', None)
         
         if user and token:
-             user.tokens = [t for t in getattr(user, 'tokens', []) if t.get('token') != token]
-             user.save()
+             token_store.revoke(token)
+             auth_cache.invalidate_token(token)
              
         return ApiResponse(200, {
              "message": 'Logged out successfully'
@@ -273,8 +270,10 @@ def logout_all():
         user = getattr(request, 'user', None)
         
         if user:
-             user.tokens = []
-             user.save()
+             token_store.revoke_all(user._id)
+             # Drop any legacy embedded tokens as well
+             User.findOneAndUpdate({"_id": user._id}, {"$unset": {"tokens": ""}})
+             auth_cache.invalidate_user(user._id)
              
         return ApiResponse(200, {
              "message": 'Logged out from all devices'
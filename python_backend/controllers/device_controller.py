@@ -5,6 +5,7 @@ from models.Device import Device
 from models.TriggerSession import TriggerSession
 from utils.api_error import ApiError
 from utils.api_response import ApiResponse
+from services.auth_cache import auth_cache
 
 def create_device():
     try:
@@ -15,7 +16,7 @@ def create_device():
         if not device_id or not device_password:
              raise ApiError(400, 'Device ID and password are required')
 
-        existing_device = Device.findOne({"deviceId": device_id})
+        existing_device = Device.findOne({"deviceId": device_id}, projection={"_id": 1}, lean=True)
         if existing_device:
              raise ApiError(400, 'Device ID already exists')
 
@@ -77,6 +78,7 @@ def link_device():
         if trimmed_device_id not in getattr(user, 'deviceIds', []):
             user.deviceIds = getattr(user, 'deviceIds', []) + [trimmed_device_id]
             user.save()
+            auth_cache.invalidate_user(user._id)
 
         return ApiResponse(200, {
             "success": True,
@@ -97,9 +99,9 @@ def link_device():
 
 def get_current_location(device_id):
     session = TriggerSession.findOne({"deviceId": device_id, "status": "active"})
-    if not session or not hasattr(session, 'coordinates') or not session.coordinates:
+    if not session:
         return None
-    return session.coordinates[-1]
+    return session.last_location()
 
 def get_device_info(device_id=None):
     try:
@@ -207,13 +209,13 @@ def get_public_emergency_contacts(device_id=None):
         if not device_id:
              raise ApiError(400, 'Device ID is required')
 
-        device = Device.findOne({"deviceId": device_id})
+        device = Device.findOne({"deviceId": device_id}, projection={"emergencyContacts": 1}, lean=True)
 
         if not device:
             raise ApiError(404, 'Device not found')
 
         # Return only phone numbers
-        contacts = [{"phone": c.get('phone')} for c in getattr(device, 'emergencyContacts', []) if c.get('phone')]
+        contacts = [{"phone": c.get('phone')} for c in device.get('emergencyContacts', []) if c.get('phone')]
 
         return ApiResponse(200, {
             "success": True,
@@ -1,13 +1,34 @@
+import math
+import threading
+import time
+from itertools import islice
 from flask import request, jsonify
 from datetime import datetime
 from models.User import User
 from models.Device import Device
 from models.TriggerSession import TriggerSession
+from models.SessionCoordinate import SessionCoordinate
 from utils.api_error import ApiError
-from utils.api_response import ApiResponse
-from services.sms_service import sms_service
-
-active_sessions = {}
+from utils.api_response import ApiResponse, stream_array_response, sse_event, sse_response
+from utils.timestamps import parse_timestamp, format_timestamp
+from utils.pagination import encode_cursor, decode_cursor, keyset_filter
+from utils.cache import TTLCache
+from utils.trajectory import simplify
+from utils import coordinate_codec
+from config.env import Config
+from services.sms_dispatcher import sms_dispatcher
+from services.location_broker import location_broker
+from services.session_registry import session_registry
+from services.coordinate_buffer import coordinate_buffer
+from services import token_service
+
+# Per-worker cache of history totals, dropped when the user starts a session
+history_totals = TTLCache(maxsize=10000, ttl=Config.HISTORY_TOTAL_CACHE_SECONDS)
+# Simplified tracks of completed sessions, which never change
+simplified_tracks = TTLCache(maxsize=Config.TRACK_CACHE_MAX_SIZE, ttl=Config.TRACK_CACHE_SECONDS)
+# Each open live-location stream holds a server thread; past SSE_MAX_STREAMS
+# per worker new ones get a 503 so the rest of the API keeps its threads
+open_streams = threading.BoundedSemaphore(max(Config.SSE_MAX_STREAMS, 1))
 
 def start_trigger():
     try:
@@ -21,8 +42,8 @@ def start_trigger():
         if not device: raise ApiError(404, "Device not found")
 
         if getattr(device, 'currentSession', None):
-             old_session = TriggerSession.findOne({"_id": device.currentSession})
-             if old_session and getattr(old_session, 'status', None) == 'active':
+             old_session = TriggerSession.findOne({"_id": device.currentSession}, projection={"status": 1}, lean=True)
+             if old_session and old_session.get('status') == 'active':
                   raise ApiError(400, "Device already has an active session")
 
         owner_id = getattr(device, 'ownerId', None)
@@ -33,7 +54,7 @@ def start_trigger():
             status="active",
             startTime=datetime.utcnow(),
             triggerStartLocation=initial_location,
-            coordinates=[]
+            coordinatesCount=0
         )
         session.save()
 
@@ -42,25 +63,27 @@ def start_trigger():
         device.isTriggered = True
         device.save()
 
-        active_sessions[device_id] = {
-             "sessionId": str(session._id),
-             "lastUpdate": datetime.utcnow(),
-             "coordinatesCount": 0
-        }
+        if owner_id:
+             history_totals.remove_where(lambda key, value: key[0] == str(owner_id))
 
+        session_registry.register(device_id, session)
+
+        # Only enqueued here, delivery status lands on session.smsDeliveries
         emergency_contacts = getattr(device, 'emergencyContacts', [])
+        sms_queued = 0
         if emergency_contacts:
              try:
-                 sms_service.send_emergency_sms(emergency_contacts, device_id)
+                 sms_queued = sms_dispatcher.dispatch_emergency(session._id, emergency_contacts, device_id, started_at=session.startTime)
              except Exception as e:
-                 print(f"Failed to send SMS: {e}")
+                 print(f"Failed to queue SMS: {e}")
 
         return ApiResponse(201, {
             "message": "Trigger session started",
             "sessionId": session._id,
             "startTime": session.startTime,
             "triggerStartLocation": session.triggerStartLocation,
-            "smsSent": len(emergency_contacts) > 0
+            "smsSent": sms_queued > 0,
+            "smsQueued": sms_queued
         }).to_response()
 
     except ApiError as e:
@@ -68,52 +91,152 @@ def start_trigger():
     except Exception as error:
         return jsonify({"success": False, "message": str(error)}), 500
 
-def add_coordinates():
+def _number(fix, field, low=None, high=None):
+    # Float value of a fix field (numeric strings included), None when absent
+    value = fix.get(field)
+    if value is None:
+         return None
     try:
-        data = request.get_json()
-        device_id = data.get('deviceId')
-        lat = data.get('latitude')
-        lng = data.get('longitude')
-        accuracy = data.get('accuracy')
-        speed = data.get('speed')
+         if isinstance(value, bool):
+              raise ValueError
+         value = float(value)
+    except (TypeError, ValueError):
+         raise ApiError(400, f'{field} must be a number')
+    if not math.isfinite(value) or (low is not None and not low <= value <= high):
+         raise ApiError(400, f'{field} is out of range: {fix.get(field)}')
+    return value
+
+def _build_coordinate(fix, default_timestamp=None):
+    if not isinstance(fix, dict):
+         raise ApiError(400, 'Each fix must be an object')
+    lat = _number(fix, 'latitude', -90, 90)
+    lng = _number(fix, 'longitude', -180, 180)
+    if lat is None or lng is None:
+         raise ApiError(400, 'Each fix needs latitude and longitude')
 
-        if not device_id or lat is None or lng is None:
-             raise ApiError(400, 'Device ID and coordinates are required')
+    try:
+         timestamp = parse_timestamp(fix.get('timestamp'), default_timestamp or datetime.utcnow())
+    except ValueError as e:
+         raise ApiError(400, str(e))
+    # MongoDB keeps milliseconds; truncating up front lets a retried upload
+    # match the fixes already stored (SessionCoordinate.without_stored)
+    timestamp = timestamp.replace(microsecond=timestamp.microsecond // 1000 * 1000)
+
+    return {
+         "latitude": lat,
+         "longitude": lng,
+         "accuracy": _number(fix, 'accuracy'),
+         "speed": _number(fix, 'speed'),
+         "timestamp": timestamp
+    }
+
+def _with_active_session(device_id, action):
+    # Runs action(entry) for the device's active session from the registry.
+    # action returns None when its conditional write found the session no
+    # longer active (stopped by another worker while this one still had it
+    # cached), in which case the entry is re-read once from shared storage.
+    for _ in range(2):
+        entry = session_registry.get(device_id)
+        if not entry:
+             break
+        result = action(entry)
+        if result is not None:
+             return result
+        session_registry.invalidate(device_id)
+    raise ApiError(404, 'No active session found for device')
+
+def _append_coordinates(device_id, new_coordinates, deduplicate=True):
+    # Returns (session id, coordinates count); the count is None when the
+    # fixes were only buffered (INGEST_MODE=buffered)
+    if Config.INGEST_MODE == 'buffered':
+         entry = session_registry.get(device_id)
+         if not entry:
+              raise ApiError(404, 'No active session found for device')
+         coordinate_buffer.add(device_id, entry, new_coordinates)
+         return entry['sessionId'], None
+
+    def append(entry):
+         session = TriggerSession._from_document({"_id": entry['sessionId'], "deviceId": device_id, "userId": entry.get('userId')})
+         # Fixes go to the time-series collection; the session only keeps a summary
+         return TriggerSession.record_coordinates(session, new_coordinates, deduplicate=deduplicate)
+
+    session = _with_active_session(device_id, append)
+
+    Device.findOneAndUpdate({"deviceId": device_id}, {"$set": {"lastActive": datetime.utcnow()}}, projection={"_id": 1}, lean=True)
+    location_broker.publish(session._id)
+
+    return session._id, session.coordinates_count()
+
+def _single_fix(data):
+    # (device id, [coordinate]) from an add_coordinates body; shared with asgi.py
+    device_id = data.get('deviceId')
+
+    if not device_id or data.get('latitude') is None or data.get('longitude') is None:
+         raise ApiError(400, 'Device ID and coordinates are required')
+
+    return device_id, [_build_coordinate({
+         "latitude": data.get('latitude'),
+         "longitude": data.get('longitude'),
+         "accuracy": data.get('accuracy'),
+         "speed": data.get('speed')
+    })]
+
+def _batch_fixes(data):
+    # (device id, coordinates) from an add_coordinates_batch body; shared with asgi.py
+    device_id = data.get('deviceId')
+    fixes = data.get('coordinates')
+
+    if not device_id or not fixes or not isinstance(fixes, list):
+         raise ApiError(400, 'Device ID and a coordinates array are required')
+
+    if len(fixes) > Config.MAX_COORDINATES_BATCH:
+         raise ApiError(400, f'At most {Config.MAX_COORDINATES_BATCH} coordinates per batch')
+
+    received_at = datetime.utcnow()
+    new_coordinates = [_build_coordinate(fix, received_at) for fix in fixes]
+    # Buffered fixes can arrive out of order, keep the track chronological
+    new_coordinates.sort(key=lambda c: c['timestamp'])
+    return device_id, new_coordinates
+
+def _may_repeat(data):
+    # Whether a batch can be a retried upload: server-stamped single fixes
+    # never match stored ones, so they skip the duplicate lookup
+    fixes = data.get('coordinates') or []
+    return len(fixes) > 1 or any(isinstance(fix, dict) and fix.get('timestamp') is not None for fix in fixes)
+
+def _coordinates_added(session_id, coordinates_count, new_coordinates, batch=False):
+    data = {
+         "message": f'{len(new_coordinates)} coordinates added to session' if batch else 'Coordinates added to session',
+         "sessionId": session_id
+    }
+    if batch:
+         data["accepted"] = len(new_coordinates)
+    data.update({
+         "coordinatesCount": coordinates_count,
+         "buffered": coordinates_count is None,
+         "latestLocation": new_coordinates[-1]
+    })
+    return data
 
-        device = Device.findOne({"deviceId": device_id})
-        current_session_id = getattr(device, 'currentSession', None)
-        
-        if not device or not current_session_id:
-             raise ApiError(404, 'No active session found for device')
+def add_coordinates():
+    try:
+        device_id, new_coordinates = _single_fix(request.get_json())
+        session_id, coordinates_count = _append_coordinates(device_id, new_coordinates, deduplicate=False)
 
-        session = TriggerSession.findOne({"_id": current_session_id, "status": "active"})
-        if not session:
-             raise ApiError(404, 'No active session found for device')
-
-        new_coordinate = {
-             "latitude": lat,
-             "longitude": lng,
-             "accuracy": accuracy,
-             "speed": speed,
-             "timestamp": datetime.utcnow()
-        }
+        return ApiResponse(200, _coordinates_added(session_id, coordinates_count, new_coordinates)).to_response()
 
-        session.coordinates.append(new_coordinate)
-        session.save()
+    except ApiError as e:
+        return jsonify({"success": False, "message": e.message}), e.status_code
+    except Exception as error:
+        return jsonify({"success": False, "message": str(error)}), 500
 
-        device.lastActive = datetime.utcnow()
-        device.save()
-        
-        if device_id in active_sessions:
-             active_sessions[device_id]['lastUpdate'] = datetime.utcnow()
-             active_sessions[device_id]['coordinatesCount'] = len(session.coordinates)
+def add_coordinates_batch():
+    try:
+        data = request.get_json()
+        device_id, new_coordinates = _batch_fixes(data)
+        session_id, coordinates_count = _append_coordinates(device_id, new_coordinates, _may_repeat(data))
 
-        return ApiResponse(200, {
-             "message": 'Coordinates added to session',
-             "sessionId": session._id,
-             "coordinatesCount": len(session.coordinates),
-             "latestLocation": new_coordinate
-        }).to_response()
+        return ApiResponse(200, _coordinates_added(session_id, coordinates_count, new_coordinates, batch=True)).to_response()
 
     except ApiError as e:
         return jsonify({"success": False, "message": e.message}), e.status_code
@@ -128,38 +251,48 @@ def stop_trigger():
 
         if not device_id: raise ApiError(400, 'Device ID is required')
 
-        device = Device.findOne({"deviceId": device_id})
-        current_session_id = getattr(device, 'currentSession', None)
-
-        if not device or not current_session_id:
-             raise ApiError(404, 'No active session found for device')
-
-        session = TriggerSession.findOne({"_id": current_session_id, "status": "active"})
-        if not session:
-              raise ApiError(404, 'No active session found for device')
-              
-        session.status = "completed"
-        session.endTime = datetime.utcnow()
-        session.manualStop = manual_stop
-        session.save()
-
-        device.currentSession = None
-        device.isTriggered = False
-        device.lastActive = datetime.utcnow()
-        device.save()
-        
-        if device_id in active_sessions:
-             del active_sessions[device_id]
+        # Write fixes this worker still holds before the session closes
+        coordinate_buffer.flush(device_id)
+
+        def stop(entry):
+             end_time = datetime.utcnow()
+             return TriggerSession.findOneAndUpdate(
+                  {"_id": entry['sessionId'], "status": "active"},
+                  {"$set": {
+                       "status": "completed",
+                       "endTime": end_time,
+                       "manualStop": manual_stop,
+                       "duration": (end_time - entry['startTime']).total_seconds()
+                  }},
+                  projection=TriggerSession.summary_projection,
+                  return_document=True
+             )
+
+        session = _with_active_session(device_id, stop)
+
+        Device.findOneAndUpdate(
+             {"deviceId": device_id, "currentSession": session._id},
+             {"$set": {"currentSession": None, "isTriggered": False, "lastActive": datetime.utcnow()}},
+             projection={"_id": 1}, lean=True
+        )
+        session_registry.remove(device_id, session._id)
+        location_broker.publish(session._id)
 
-        duration = (session.endTime - session.startTime).total_seconds()
+        if Config.COORDINATE_ARCHIVE_FORMAT == 'columnar':
+             try:
+                  TriggerSession.archive_coordinates(session)
+             except Exception as e:
+                  # The per-fix documents are still there, nothing is lost
+                  print(f"Failed to archive coordinates of {session._id}: {e}")
 
         return ApiResponse(200, {
              "message": 'Trigger session stopped',
              "sessionId": session._id,
              "startTime": session.startTime,
              "endTime": session.endTime,
-             "coordinatesCount": len(session.coordinates),
-             "duration": duration
+             "coordinatesCount": session.coordinates_count(),
+             "duration": session.duration,
+             "summary": session.summary()
         }).to_response()
 
     except ApiError as e:
@@ -173,59 +306,207 @@ def get_session_history():
         if not user: raise ApiError(401, "Unauthorized")
 
         device_id = request.args.get('deviceId')
-        limit = int(request.args.get('limit', 10))
-        page = int(request.args.get('page', 1))
+        limit = max(1, min(int(request.args.get('limit', 10)), 100))
+        cursor = request.args.get('cursor')
+        page = request.args.get('page')
+        include_total = request.args.get('includeTotal', 'true').lower() == 'true'
         
         query = {"userId": user._id}
         if device_id: query["deviceId"] = device_id
-             
-        skip = (page - 1) * limit
-        sessions = TriggerSession.find(query, limit=limit, skip=skip, sort=[("startTime", -1)])
-        total = TriggerSession.countDocuments(query)
+        total_query = dict(query)
+
+        # Keyset pagination on (startTime, _id). ?page= is still honoured for
+        # old clients but has to skip over every earlier row.
+        skip = 0
+        if cursor:
+             try:
+                  start_time, last_id = decode_cursor(cursor)
+             except ValueError as e:
+                  raise ApiError(400, str(e))
+             query = {"$and": [query, keyset_filter("startTime", start_time, last_id)]}
+        elif page:
+             skip = (max(int(page), 1) - 1) * limit
+
+        # One extra row tells us whether there is a next page
+        sessions = TriggerSession.find(
+             query, projection=TriggerSession.summary_projection, lean=True,
+             limit=limit + 1, skip=skip, sort=[("startTime", -1), ("_id", -1)]
+        )
+        has_more = len(sessions) > limit
+        sessions = sessions[:limit]
 
         session_list = []
         for s in sessions:
+             summary = TriggerSession.summarize(s)
              session_list.append({
-                  "deviceId": s.deviceId,
-                  "startTime": s.startTime,
-                  "endTime": getattr(s, 'endTime', None),
-                  "status": s.status,
-                  "coordinatesCount": len(s.coordinates) if hasattr(s, 'coordinates') else 0,
-                  "manualStop": getattr(s, 'manualStop', False)
+                  "id": s['_id'],
+                  "deviceId": s.get('deviceId'),
+                  "startTime": s.get('startTime'),
+                  "endTime": s.get('endTime'),
+                  "status": s.get('status'),
+                  "coordinatesCount": TriggerSession.summary_count(s),
+                  "manualStop": s.get('manualStop', False),
+                  "duration": summary['duration'],
+                  "distance": summary['distance']
              })
 
+        pagination = {
+             "limit": limit,
+             "hasMore": has_more,
+             "nextCursor": encode_cursor(sessions[-1]['startTime'], sessions[-1]['_id']) if has_more else None
+        }
+        if page and not cursor:
+             pagination["page"] = max(int(page), 1)
+        if include_total:
+             pagination["total"] = _history_total(user._id, device_id, total_query)
+
         return ApiResponse(200, {
              "sessions": session_list,
-             "pagination": {
-                  "total": total,
-                  "page": page,
-                  "limit": limit
-             }
+             "pagination": pagination
         }).to_response()
+    except ApiError as e:
+        return jsonify({"success": False, "message": e.message}), e.status_code
     except Exception as error:
         return jsonify({"success": False, "message": str(error)}), 500
 
+def _history_total(user_id, device_id, query):
+    key = (str(user_id), device_id)
+    total = history_totals.get(key)
+    if total is None:
+        total = TriggerSession.countDocuments(query)
+        history_totals.set(key, total)
+    return total
+
+def export_sessions():
+    # Streams every session of the user; rows are read lazily from the cursor
+    try:
+        user = getattr(request, 'user', None)
+        if not user: raise ApiError(401, "Unauthorized")
+
+        device_id = request.args.get('deviceId')
+        include_coordinates = request.args.get('includeCoordinates', 'false').lower() == 'true'
+
+        query = {"userId": user._id}
+        if device_id: query["deviceId"] = device_id
+
+        projection = TriggerSession.summary_projection
+        if include_coordinates:
+             # Legacy and archived fixes come with the session document
+             projection = dict(projection, **{field: 1 for field in TriggerSession.heavy_fields})
+        sessions = TriggerSession.iter_find(query, projection=projection, lean=True, sort=[("startTime", -1)])
+
+        def rows():
+             while True:
+                  # Stored fixes are fetched for a cursor batch of sessions at a time
+                  batch = list(islice(sessions, TriggerSession.default_batch_size))
+                  if not batch:
+                       return
+                  coordinates = SessionCoordinate.for_sessions([TriggerSession._from_document(s) for s in batch]) if include_coordinates else {}
+                  for s in batch:
+                       row = {
+                            "id": str(s['_id']),
+                            "deviceId": s.get('deviceId'),
+                            "startTime": s.get('startTime'),
+                            "endTime": s.get('endTime'),
+                            "status": s.get('status'),
+                            "coordinatesCount": TriggerSession.summary_count(s),
+                            "manualStop": s.get('manualStop', False)
+                       }
+                       if include_coordinates:
+                            row["coordinates"] = coordinates[s['_id']]
+                       yield row
+
+        return stream_array_response("sessions", rows())
+    except ApiError as e:
+        return jsonify({"success": False, "message": e.message}), e.status_code
+    except Exception as error:
+        return jsonify({"success": False, "message": str(error)}), 500
+
+def _parse_since(value):
+    # ?since= (or Last-Event-ID) limits coordinates to fixes received after
+    # the client's last call: pass back the lastTimestamp of the previous
+    # response (or the SSE event id). Older clients send the ISO timestamp
+    # or epoch of their last fix instead, see SessionCoordinate.
+    if not value:
+         return None
+    try:
+         received_at, last_id = decode_cursor(value)
+         if isinstance(received_at, datetime):
+              return received_at, last_id
+    except ValueError:
+         pass
+    try:
+         return parse_timestamp(value)
+    except ValueError as e:
+         raise ApiError(400, str(e))
+
+def _since_param():
+    return _parse_since(request.args.get('since'))
+
+def _format_since(since):
+    # Cursor key as the client echoes it back
+    if isinstance(since, tuple):
+         return encode_cursor(*since)
+    return format_timestamp(since) if since else None
+
+def _simplify_params():
+    # ?maxPoints=<n> and/or ?tolerance=<metres> return a simplified track
+    # (type= conversion yields None for unparseable values)
+    max_points = request.args.get('maxPoints', type=int)
+    tolerance = request.args.get('tolerance', type=float)
+    if 'maxPoints' in request.args and (max_points is None or max_points < 2):
+         raise ApiError(400, 'maxPoints must be an integer of at least 2')
+    if 'tolerance' in request.args and (tolerance is None or tolerance < 0):
+         raise ApiError(400, 'tolerance must be a non-negative number of metres')
+    return max_points, tolerance
+
+COORDINATE_FORMATS = {
+    'full': None,
+    'columnar': coordinate_codec.columnar,
+    'polyline': coordinate_codec.polyline
+}
+
+def _format_param():
+    # ?format=columnar|polyline returns coordinates in a compact encoding
+    fmt = request.args.get('format', 'full')
+    if fmt not in COORDINATE_FORMATS:
+         raise ApiError(400, f"format must be one of: {', '.join(COORDINATE_FORMATS)}")
+    return COORDINATE_FORMATS[fmt]
+
+def _encode_coordinates(coordinates, encoder):
+    return encoder(coordinates) if encoder else coordinates
+
 def get_active_session():
     # mapped to /active (User)
     try:
         user = getattr(request, 'user', None)
         if not user: raise ApiError(401, "Unauthorized")
         
+        since = _since_param()
+        encoder = _format_param()
+
         # In Node getActiveSessions finds ALL active sessions for user.
-        sessions = TriggerSession.find({"userId": user._id, "status": "active"})
+        sessions = TriggerSession.iter_find({"userId": user._id, "status": "active"}, include_heavy=True)
         
         active_list = []
         for s in sessions:
+             coordinates, cursor = s.get_coordinates_page(since)
              active_list.append({
+                  "sessionId": s._id,
                   "deviceId": s.deviceId,
                   "startTime": s.startTime,
-                  "coordinates": s.coordinates,
-                  "triggerStartLocation": getattr(s, 'triggerStartLocation', None)
+                  "coordinates": _encode_coordinates(coordinates, encoder),
+                  "lastTimestamp": _format_since(cursor),
+                  "triggerStartLocation": getattr(s, 'triggerStartLocation', None),
+                  "summary": s.summary()
              })
 
         return ApiResponse(200, {
-             "activeSessions": active_list
+             "activeSessions": active_list,
+             "since": _format_since(since)
         }).to_response()
+    except ApiError as e:
+        return jsonify({"success": False, "message": e.message}), e.status_code
     except Exception as error:
         return jsonify({"success": False, "message": str(error)}), 500
 
@@ -234,13 +515,34 @@ def get_session_details(session_id):
         user = getattr(request, 'user', None)
         if not user: raise ApiError(401, "Unauthorized")
 
-        session = TriggerSession.findOne({"_id": session_id, "userId": user._id})
+        session = TriggerSession.findOne({"_id": session_id, "userId": user._id}, include_heavy=True)
         if not session:
              raise ApiError(404, 'Session not found')
 
-        duration = None
-        if getattr(session, 'endTime', None):
-             duration = (session.endTime - session.startTime).total_seconds()
+        since = _since_param()
+        max_points, tolerance = _simplify_params()
+        encoder = _format_param()
+        summary = session.summary()
+
+        simplified = None
+        if max_points is None and tolerance is None:
+             coordinates, cursor = session.get_coordinates_page(since)
+        else:
+             cache_key = (str(session._id), max_points, tolerance)
+             cacheable = session.status != 'active' and since is None
+             cached = simplified_tracks.get(cache_key) if cacheable else None
+             if cached is None:
+                  track, cursor = session.get_coordinates_page(since)
+                  cached = (simplify(track, tolerance=tolerance, max_points=max_points), len(track), cursor)
+                  if cacheable:
+                       simplified_tracks.set(cache_key, cached)
+             coordinates, original_points, cursor = cached
+             simplified = {
+                  "originalPoints": original_points,
+                  "points": len(coordinates),
+                  "maxPoints": max_points,
+                  "tolerance": tolerance
+             }
 
         return ApiResponse(200, {
              "session": {
@@ -249,10 +551,15 @@ def get_session_details(session_id):
                   "startTime": session.startTime,
                   "endTime": getattr(session, 'endTime', None),
                   "status": session.status,
-                  "coordinates": session.coordinates,
+                  "coordinates": _encode_coordinates(coordinates, encoder),
+                  "simplified": simplified,
+                  "since": _format_since(since),
+                  "lastTimestamp": _format_since(cursor),
                   "triggerStartLocation": getattr(session, 'triggerStartLocation', None),
                   "manualStop": getattr(session, 'manualStop', False),
-                  "duration": duration
+                  "smsDeliveries": getattr(session, 'smsDeliveries', []),
+                  "duration": summary['duration'],
+                  "summary": summary
              }
         }).to_response()
     except ApiError as e:
@@ -260,33 +567,116 @@ def get_session_details(session_id):
     except Exception as error:
         return jsonify({"success": False, "message": str(error)}), 500
 
+def create_stream_token(session_id):
+    # Token for ?token= on the session's stream (EventSource can't send the
+    # Authorization header). Clients ask for a new one on every (re)connect.
+    try:
+        user = getattr(request, 'user', None)
+        if not user: raise ApiError(401, "Unauthorized")
+
+        session = TriggerSession.findOne({"_id": session_id, "userId": user._id}, projection={"_id": 1}, lean=True)
+        if not session:
+             raise ApiError(404, 'Session not found')
+
+        return ApiResponse(200, {
+             "token": token_service.generate_stream_token(user._id, session['_id']),
+             "expiresIn": Config.SSE_TOKEN_SECONDS
+        }).to_response()
+
+    except ApiError as e:
+        return jsonify({"success": False, "message": e.message}), e.status_code
+    except Exception as error:
+        return jsonify({"success": False, "message": str(error)}), 500
+
+def stream_session(session_id):
+    # Server-sent events: one "location" event per new fix, in the order
+    # they were received (id = its cursor, so EventSource resumes via
+    # Last-Event-ID), "end" once the session stops, and comment heartbeats
+    # to keep proxies from timing out.
+    try:
+        user = getattr(request, 'user', None)
+        if not user: raise ApiError(401, "Unauthorized")
+
+        session = TriggerSession.findOne({"_id": session_id, "userId": user._id}, projection={"status": 1, "coordinates": 1, "coordinatesArchive": 1})
+        if not session:
+             raise ApiError(404, 'Session not found')
+
+        since = _parse_since(request.headers.get('Last-Event-ID') or request.args.get('since'))
+
+    except ApiError as e:
+        return jsonify({"success": False, "message": e.message}), e.status_code
+    except Exception as error:
+        return jsonify({"success": False, "message": str(error)}), 500
+
+    def events(since):
+        started = last_sent = time.monotonic()
+        yield sse_event(retry=int(Config.SSE_POLL_INTERVAL_SECONDS * 1000))
+
+        while True:
+            version = location_broker.version(session._id)
+            status = TriggerSession.findOne({"_id": session._id}, projection={"status": 1}, lean=True)
+            for coordinate, since in session.get_coordinate_arrivals(since):
+                yield sse_event("location", coordinate, event_id=_format_since(since))
+                last_sent = time.monotonic()
+
+            if not status or status.get('status') != 'active':
+                summary = TriggerSession.findOne({"_id": session._id}, projection=TriggerSession.summary_projection)
+                yield sse_event("end", {"status": status and status.get('status'), "summary": summary and summary.summary()})
+                return
+
+            now = time.monotonic()
+            if now - started >= Config.SSE_MAX_STREAM_SECONDS:
+                # The client reconnects and carries on from Last-Event-ID
+                return
+            if now - last_sent >= Config.SSE_HEARTBEAT_SECONDS:
+                yield sse_event(comment="keep-alive")
+                last_sent = now
+
+            location_broker.wait(session._id, version, min(Config.SSE_POLL_INTERVAL_SECONDS, Config.SSE_HEARTBEAT_SECONDS))
+
+    if not open_streams.acquire(blocking=False):
+        response = jsonify({"success": False, "message": 'Too many open streams, try again later'})
+        response.headers['Retry-After'] = str(int(Config.SSE_POLL_INTERVAL_SECONDS * 5))
+        return response, 503
+
+    response = sse_response(events(since))
+    # Also runs when the client goes away before the first event
+    response.call_on_close(open_streams.release)
+    return response
+
 def get_session_status(device_id):
     try:
         user = getattr(request, 'user', None)
         if not user: raise ApiError(401, "Unauthorized")
 
-        device = Device.findOne({"deviceId": device_id, "ownerId": user._id})
-        if not device:
-             raise ApiError(404, 'Device not found')
+        entry = session_registry.get(device_id)
+        owns_session = entry and entry.get('userId') and str(entry['userId']) == str(user._id)
+        if not owns_session:
+             # No session to vouch for ownership, check the device itself
+             device = Device.findOne({"deviceId": device_id, "ownerId": user._id}, projection={"_id": 1}, lean=True)
+             if not device:
+                  raise ApiError(404, 'Device not found')
 
-        current_session_id = getattr(device, 'currentSession', None)
-        if not current_session_id:
+        if not entry:
              return ApiResponse(200, { "isActive": False, "message": 'No active session' }).to_response()
 
-        session = TriggerSession.findOne({"_id": current_session_id, "status": "active"})
+        session = TriggerSession.findOne({"_id": entry['sessionId'], "status": "active"}, projection=TriggerSession.summary_projection)
         if not session:
+             session_registry.invalidate(device_id)
              return ApiResponse(200, { "isActive": False, "message": 'No active session' }).to_response()
 
         last_update = None
-        if session.coordinates:
-             last_update = session.coordinates[-1]['timestamp']
+        last_location = session.last_location()
+        if last_location:
+             last_update = last_location['timestamp']
 
         return ApiResponse(200, {
              "isActive": True,
              "sessionId": session._id,
              "startTime": session.startTime,
-             "coordinatesCount": len(session.coordinates),
+             "coordinatesCount": session.coordinates_count(),
              "lastUpdate": last_update,
+             "summary": session.summary(),
              # "updateInterval": device.locationUpdateInterval # If implemented
         }).to_response()
     except ApiError as e:
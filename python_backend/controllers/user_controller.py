@@ -2,23 +2,31 @@ from flask import request, jsonify
 from models.User import User
 from models.Device import Device
 from models.TriggerSession import TriggerSession
+from models.SessionCoordinate import SessionCoordinate
 from utils.api_error import ApiError
 from utils.api_response import ApiResponse
+from services.auth_cache import auth_cache
+from services.token_store import token_store
+from services.session_registry import session_registry
 
 def get_profile():
     try:
         user = getattr(request, 'user', None)
         if not user: raise ApiError(401, "Unauthorized")
 
-        devices = Device.find({"ownerId": user._id})
+        devices = Device.find(
+            {"ownerId": user._id},
+            projection={"_id": 0, "deviceId": 1, "isTriggered": 1, "lastActive": 1},
+            lean=True
+        )
         
         device_list = []
         if devices:
             for device in devices:
                 device_list.append({
-                    "deviceId": device.deviceId,
-                    "isTriggered": getattr(device, 'isTriggered', False),
-                    "lastActive": getattr(device, 'lastActive', None)
+                    "deviceId": device.get('deviceId'),
+                    "isTriggered": device.get('isTriggered', False),
+                    "lastActive": device.get('lastActive')
                 })
 
         return ApiResponse(200, {
@@ -48,6 +56,7 @@ def update_profile():
         if name: user.name = name
         if email: user.email = email
         user.save()
+        auth_cache.invalidate_user(user._id)
 
         return ApiResponse(200, {
             "message": 'Profile updated successfully',
@@ -71,13 +80,11 @@ def change_password():
         user = getattr(request, 'user', None)
         if not user: raise ApiError(401, "Unauthorized")
         
-        # User model in python caches password in object if loaded, or we might need to fetch it
-        # If Middleware only fetched strict fields, password might be missing if it was select:False
-        # My Model implementation defaults to fetching all provided fields. 
-        # But User defined password as select:False in Node. In Python implementation of Model.find, it fetches all.
-        # But if password was not in projection...
-        # Let's verify password.
-        
+        # request.user is the cached principal without the password hash,
+        # like select:false in Node, so load the full document here.
+        user = User.findById(user._id)
+        if not user: raise ApiError(404, "User not found")
+
         is_match = user.compare_password(current_password)
         if not is_match:
              raise ApiError(401, 'Current password is incorrect')
@@ -85,6 +92,12 @@ def change_password():
         user.password = new_password
         # Save handles hashing
         user.save()
+        # Sign out every other login; the token making this request stays valid
+        token_store.revoke_all(user._id, keep=getattr(request, 'token', None))
+        # Legacy embedded tokens too, or LEGACY_TOKEN_FALLBACK would migrate
+        # them back in (this request's token was migrated when it came in)
+        User.findOneAndUpdate({"_id": user._id}, {"$unset": {"tokens": ""}}, projection={"_id": 1}, lean=True)
+        auth_cache.invalidate_user(user._id)
         
         return ApiResponse(200, {
              "message": 'Password changed successfully'
@@ -107,6 +120,10 @@ def delete_account():
         User.deleteOne({"_id": user_id})
         Device.deleteMany({"ownerId": user_id})
         TriggerSession.deleteMany({"userId": user_id})
+        SessionCoordinate.deleteMany({"meta.userId": user_id})
+        session_registry.remove_user(user_id)
+        token_store.revoke_all(user_id)
+        auth_cache.invalidate_user(user_id)
         
         return ApiResponse(200, {
              "message": 'Account and all associated data deleted successfully'
@@ -136,6 +153,7 @@ def unlink_device(device_id):
         # User.findByIdAndUpdate(userId, { $pull: { deviceIds: deviceId } })
         
         User.findOneAndUpdate({"_id": user._id}, {"$pull": {"deviceIds": device_id}})
+        auth_cache.invalidate_user(user._id)
         
         return ApiResponse(200, {
              "message": 'Device removed successfully'
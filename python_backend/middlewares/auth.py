@@ -1,10 +1,78 @@
 from functools import wraps
+from datetime import datetime
+from bson import ObjectId
 from flask import request, g, jsonify
 from models.User import User
 from services import token_service
+from services.auth_cache import auth_cache
+from services.token_store import token_store
+from config.env import Config
 from utils.api_error import ApiError
 
-def auth_required(f):
+def migrate_legacy_token(token, user_id, decoded):
+    # Tokens issued before the token store existed are embedded in the user
+    # document. Move one over the first time it is used.
+    if not Config.LEGACY_TOKEN_FALLBACK:
+        return False
+
+    user = User.findOneAndUpdate(
+        {'_id': user_id, 'tokens.token': token},
+        {'$pull': {'tokens': {'token': token}}},
+        projection={'_id': 1},
+        lean=True
+    )
+    if not user:
+        return False
+
+    token_store.add(token, user_id, datetime.utcfromtimestamp(decoded['exp']) if decoded.get('exp') else None)
+    return True
+
+def token_principal(token):
+    decoded = token_service.verify_token(token)
+
+    # verify_token might return None or raise error if invalid;
+    # scoped tokens (stream tokens) don't authenticate anything else
+    if not decoded or decoded.get('scope'):
+         raise ApiError(401, 'Invalid token')
+
+    # Recently confirmed principals need no lookup at all. Otherwise the
+    # token is checked against the shared token store, and the user lookup
+    # is skipped while its version matches the cached principal.
+    principal = auth_cache.current(token)
+    if principal is not None:
+        return principal
+
+    user_id = ObjectId(decoded.get('id'))
+    version = token_store.version(token, user_id)
+    if version is None:
+        if not migrate_legacy_token(token, user_id, decoded):
+            raise ApiError(401, 'Invalid token')
+        version = token_store.version(token, user_id)
+
+    principal = auth_cache.get(token, version)
+    if principal is None:
+        principal = User.findOne({'_id': user_id}, projection=User.principal_projection, lean=True)
+        if not principal:
+            raise ApiError(401, 'Invalid token')
+
+        auth_cache.put(token, principal, version, expires_at=decoded.get('exp'))
+    return principal
+
+def stream_principal(token, session_id):
+    # Principal for a ?token= stream token (token_service.generate_stream_token).
+    # It isn't in the token store; it expires within SSE_TOKEN_SECONDS.
+    decoded = token_service.verify_stream_token(token, session_id)
+    if not decoded:
+        raise ApiError(401, 'Invalid stream token')
+    principal = User.findOne({'_id': ObjectId(decoded.get('id'))}, projection=User.principal_projection, lean=True)
+    if not principal:
+        raise ApiError(401, 'Invalid stream token')
+    return principal
+
+def auth_required(f, allow_stream_token=False):
+    # allow_stream_token: without an Authorization header, accept a stream
+    # token for the route's session_id as ?token=..., for clients that can't
+    # set headers (EventSource). Only for the live-location stream.
     @wraps(f)
     def decorated_function(*args, **kwargs):
         try:
@@ -13,24 +81,15 @@ def auth_required(f):
                 auth_header = request.headers['Authorization']
                 if auth_header.startswith('Bearer '):
                     token = auth_header.split(' ')[1]
-            
-            if not token:
-                raise ApiError(401, 'Authentication required')
-
-            # We need to ensure verify_token is available in token_service
-            decoded = token_service.verify_token(token)
-            
-            # verify_token might return None or raise error if invalid
-            if not decoded:
-                 raise ApiError(401, 'Invalid token')
 
-            user = User.findOne({
-                '_id': decoded.get('id'),
-                'tokens.token': token
-            })
+            if token:
+                principal = token_principal(token)
+            elif allow_stream_token and request.args.get('token'):
+                principal = stream_principal(request.args['token'], kwargs.get('session_id'))
+            else:
+                raise ApiError(401, 'Authentication required')
 
-            if not user:
-                raise ApiError(401, 'Invalid token')
+            user = User._from_document(principal)
 
             # Store user in g (flask global) or request
             # g.user is standard in Flask, but sometimes request.user is used for ease of access
@@ -1,15 +1,22 @@
+import hmac
 from functools import wraps
 from flask import request, jsonify
 from config.env import Config
 from utils.api_error import ApiError
 
+def valid_api_key(api_key):
+    # Constant-time comparison, so response timing doesn't leak the key
+    if not api_key or not Config.API_KEY:
+        return False
+    return hmac.compare_digest(api_key.encode('utf-8'), Config.API_KEY.encode('utf-8'))
+
 def device_auth_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         try:
             api_key = request.headers.get('x-api-key')
             
-            if not api_key or api_key != Config.API_KEY:
+            if not valid_api_key(api_key):
                 raise ApiError(401, 'Invalid API key')
                 
         except ApiError as e:
@@ -0,0 +1,49 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config.db import connect_db, close_db
+from models.TriggerSession import TriggerSession
+from models.SessionCoordinate import SessionCoordinate
+
+# Moves coordinates embedded in triggersessions documents into the
+# sessioncoordinates time-series collection. Readers merge both layouts,
+# so this can run while the API is serving traffic.
+#
+# Safe to interrupt and re-run: fixes already copied are skipped, and the
+# summary is recomputed from the stored fixes in the same update that drops
+# the embedded array, so nothing is inserted or counted twice.
+
+def migrate_coordinates(batch_size=100):
+    SessionCoordinate.ensure_collection()
+    collection = TriggerSession.get_collection()
+    migrated_sessions = 0
+    migrated_fixes = 0
+    dropped_fixes = 0
+
+    query = {"coordinates.0": {"$exists": True}}
+    for doc in collection.find(query, batch_size=batch_size):
+        session = TriggerSession(**doc)
+        legacy = [
+            c for c in session.coordinates
+            if c.get('timestamp') and c.get('latitude') is not None and c.get('longitude') is not None
+        ]
+        dropped = len(session.coordinates) - len(legacy)
+        if dropped:
+            print(f"Session {session._id}: dropping {dropped} fixes without latitude, longitude or timestamp")
+            dropped_fixes += dropped
+
+        fresh = SessionCoordinate.without_stored(session, sorted(legacy, key=lambda c: c['timestamp']))
+        SessionCoordinate.append(session, fresh)
+        TriggerSession.rebuild_summary(session, drop_legacy=True)
+        migrated_sessions += 1
+        migrated_fixes += len(fresh)
+
+    print(f"Migrated {migrated_fixes} coordinates from {migrated_sessions} sessions ({dropped_fixes} invalid dropped)")
+
+if __name__ == "__main__":
+    if not connect_db():
+        sys.exit(1)
+    migrate_coordinates()
+    close_db()
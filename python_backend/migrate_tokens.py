@@ -0,0 +1,43 @@
+import sys
+import os
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config.db import connect_db, close_db
+from models.User import User
+from models.AuthToken import AuthToken
+from services import token_service
+from services.token_store import token_store
+
+# Moves login tokens embedded in users.tokens into the token store.
+# Expired or invalid tokens are dropped instead of migrated.
+
+def migrate_tokens(batch_size=100):
+    AuthToken.sync_indexes()
+    collection = User.get_collection()
+    migrated_users = 0
+    migrated_tokens = 0
+    dropped_tokens = 0
+
+    query = {"tokens": {"$exists": True}}
+    for doc in collection.find(query, {"tokens": 1}, batch_size=batch_size):
+        for entry in doc.get('tokens') or []:
+            token = entry.get('token') if isinstance(entry, dict) else None
+            decoded = token_service.verify_token(token) if token else None
+            if not decoded or decoded.get('id') != str(doc['_id']):
+                dropped_tokens += 1
+                continue
+            token_store.add(token, doc['_id'], datetime.utcfromtimestamp(decoded['exp']))
+            migrated_tokens += 1
+
+        collection.update_one({"_id": doc['_id']}, {"$unset": {"tokens": ""}})
+        migrated_users += 1
+
+    print(f"Migrated {migrated_tokens} tokens for {migrated_users} users ({dropped_tokens} expired or invalid dropped)")
+
+if __name__ == "__main__":
+    if not connect_db():
+        sys.exit(1)
+    migrate_tokens()
+    close_db()
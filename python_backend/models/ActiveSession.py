@@ -0,0 +1,10 @@
+from pymongo import ASCENDING, IndexModel
+from .Model import Model
+
+class ActiveSession(Model):
+    # Device -> currently active TriggerSession, shared by all workers.
+    # Maintained by services.session_registry.
+    collection_name = 'activesessions'
+    indexes = [
+        IndexModel([('deviceId', ASCENDING)], unique=True)
+    ]
@@ -0,0 +1,12 @@
+from pymongo import ASCENDING, IndexModel
+from .Model import Model
+
+class AuthToken(Model):
+    # Issued login tokens, stored by SHA-256 hash. MongoDB drops them once
+    # expiresAt passes, which matches the JWT lifetime.
+    collection_name = 'authtokens'
+    indexes = [
+        IndexModel([('tokenHash', ASCENDING)], unique=True),
+        IndexModel([('userId', ASCENDING)]),
+        IndexModel([('expiresAt', ASCENDING)], expireAfterSeconds=0)
+    ]
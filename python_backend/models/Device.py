@@ -1,8 +1,14 @@
-import bcrypt
+from pymongo import ASCENDING, IndexModel
+from services.password_service import password_hasher
+from utils.passwords import is_hashed
 from .Model import Model
 
 class Device(Model):
     collection_name = 'devices'
+    indexes = [
+        IndexModel([('deviceId', ASCENDING)], unique=True),
+        IndexModel([('ownerId', ASCENDING)])
+    ]
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -15,16 +21,21 @@ class Device(Model):
         if not hasattr(self, 'isTriggered'):
              self.isTriggered = False
 
-    def save(self):
+    def save(self, replace=False):
          if hasattr(self, 'devicePassword') and self.devicePassword:
-            if len(self.devicePassword) != 60:
-                self.devicePassword = bcrypt.hashpw(self.devicePassword.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-         return super().save()
+            if not is_hashed(self.devicePassword):
+                self.devicePassword = password_hasher.hash(self.devicePassword)
+         return super().save(replace=replace)
 
     def compare_password(self, candidate_password):
-        if not hasattr(self, 'devicePassword'):
+        if not getattr(self, 'devicePassword', None):
             return False
-        return bcrypt.checkpw(candidate_password.encode('utf-8'), self.devicePassword.encode('utf-8'))
+        if not password_hasher.verify(candidate_password, self.devicePassword):
+            return False
+        if password_hasher.needs_rehash(self.devicePassword):
+            self.devicePassword = password_hasher.hash(candidate_password)
+            Device.findOneAndUpdate({"_id": self._id}, {"$set": {"devicePassword": self.devicePassword}}, projection={"_id": 1}, lean=True)
+        return True
         
     # Alias
     async def comparePassword(self, candidate_password):
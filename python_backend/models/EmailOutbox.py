@@ -0,0 +1,19 @@
+from pymongo import ASCENDING, IndexModel
+from .Model import Model
+
+class EmailOutbox(Model):
+    # Outgoing mail waiting for services.email_outbox workers.
+    # status: pending -> sending -> sent | failed
+    collection_name = 'emailoutbox'
+    indexes = [
+        IndexModel([('status', ASCENDING), ('nextAttemptAt', ASCENDING)]),
+        # Delivered and failed messages are kept a week for troubleshooting
+        # (without their html, see services.email_outbox)
+        IndexModel([('sentAt', ASCENDING)], expireAfterSeconds=7 * 24 * 3600),
+        IndexModel(
+            [('createdAt', ASCENDING)],
+            name='createdAt_failed_ttl',
+            expireAfterSeconds=7 * 24 * 3600,
+            partialFilterExpression={'status': 'failed'}
+        )
+    ]
@@ -1,9 +1,26 @@
+import copy
 from datetime import datetime
 from bson import ObjectId
-from config.db import get_db
+from pymongo.errors import CollectionInvalid, OperationFailure
+from config.db import get_db, get_async_db
 
 class Model:
     collection_name = None
+    # Subclasses declare their indexes as pymongo IndexModel instances and
+    # optionally time-series options; sync_all_indexes() reconciles them.
+    indexes = []
+    timeseries = None
+    # Fields the finders skip by default, see _projection()
+    heavy_fields = ()
+    # Documents per cursor round-trip in iter_find()
+    default_batch_size = 100
+
+    _registry = []
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.collection_name:
+            Model._registry.append(cls)
 
     def __init__(self, **kwargs):
         for key, value in kwargs.items():
@@ -20,66 +37,207 @@ class Model:
             raise Exception("Database not connected")
         return db[cls.collection_name]
 
-    def save(self):
+    @classmethod
+    def ensure_collection(cls):
+        # Time-series collections have to exist before any index is created,
+        # otherwise create_index would implicitly make a regular collection.
+        if not cls.timeseries:
+            return
+        db = cls.get_collection().database
+        if cls.collection_name in db.list_collection_names():
+            return
+        try:
+            db.create_collection(cls.collection_name, timeseries=cls.timeseries)
+        except CollectionInvalid:
+            # Another worker created it first
+            pass
+        except OperationFailure as err:
+            print(f'Time-series collections unavailable for {cls.collection_name} ({err}), using a regular collection')
+
+    @classmethod
+    def sync_indexes(cls, drop_extra=False, dry_run=False):
+        collection = cls.get_collection()
+        if not dry_run:
+            cls.ensure_collection()
+
+        existing = collection.index_information()
+        declared = {index.document['name']: index for index in cls.indexes}
+        report = {'created': [], 'missing': [], 'extra': [], 'dropped': [], 'conflicts': [], 'errors': []}
+
+        for name, index in declared.items():
+            spec = index.document
+            current = existing.get(name)
+            if current is None:
+                if dry_run:
+                    report['missing'].append(name)
+                    continue
+                try:
+                    collection.create_indexes([index])
+                    report['created'].append(name)
+                except OperationFailure as err:
+                    report['errors'].append(f'{name}: {err}')
+                continue
+
+            for option in ('unique', 'expireAfterSeconds', 'partialFilterExpression', 'sparse'):
+                if spec.get(option) != current.get(option):
+                    report['conflicts'].append(f'{name}.{option}: declared {spec.get(option)!r}, found {current.get(option)!r}')
+
+        for name in existing:
+            if name == '_id_' or name in declared:
+                continue
+            if drop_extra and not dry_run:
+                collection.drop_index(name)
+                report['dropped'].append(name)
+            else:
+                report['extra'].append(name)
+
+        return report
+
+    @classmethod
+    def sync_all_indexes(cls, drop_extra=False, dry_run=False):
+        reports = {}
+        for model in Model._registry:
+            reports[model.collection_name] = model.sync_indexes(drop_extra=drop_extra, dry_run=dry_run)
+        return reports
+
+    @classmethod
+    def _from_document(cls, data):
+        # Instances loaded from the DB remember what they looked like so that
+        # save() can send only the fields that changed since.
+        instance = cls(**data)
+        instance._mark_clean()
+        return instance
+
+    def _mark_clean(self):
+        self.__dict__['_original'] = copy.deepcopy(self.to_document())
+
+    def to_document(self):
+        return {k: v for k, v in self.__dict__.items() if k == '_id' or not k.startswith('_')}
+
+    def get_changes(self):
+        original = self.__dict__.get('_original') or {}
+        current = self.to_document()
+        set_fields, unset_fields, push_fields = {}, {}, {}
+
+        for key, value in current.items():
+            if key == '_id':
+                continue
+            if key not in original:
+                set_fields[key] = value
+                continue
+            old = original[key]
+            if value == old:
+                continue
+            # Lists that only grew at the end become a $push
+            if isinstance(value, list) and isinstance(old, list) and len(value) > len(old) and value[:len(old)] == old:
+                push_fields[key] = {'$each': value[len(old):]}
+            else:
+                set_fields[key] = value
+
+        for key in original:
+            if key not in current:
+                unset_fields[key] = ""
+
+        update = {}
+        if set_fields: update['$set'] = set_fields
+        if unset_fields: update['$unset'] = unset_fields
+        if push_fields: update['$push'] = push_fields
+        return update
+
+    def is_modified(self, field=None):
+        changes = self.get_changes()
+        if field is None:
+            return bool(changes)
+        return any(field in fields for fields in changes.values())
+
+    def save(self, replace=False):
         collection = self.get_collection()
-        data = self.__dict__.copy()
-        
-        # Remove None values or handle defaults if needed? 
-        # For now, we dump everything.
-        # But we should remove keys that are not part of the document if they are internal
-        
+
         if hasattr(self, '_id') and self._id:
-            # Update
-            collection.replace_one({'_id': self._id}, data, upsert=True)
+            if replace or self.__dict__.get('_original') is None:
+                # Explicit full replacement, or an instance we never loaded
+                collection.replace_one({'_id': self._id}, self.to_document(), upsert=True)
+            else:
+                update = self.get_changes()
+                if update:
+                    collection.update_one({'_id': self._id}, update)
         else:
             # Insert
-            if 'createdAt' not in data:
-                 data['createdAt'] = datetime.utcnow()
+            if not hasattr(self, 'createdAt'):
+                self.createdAt = datetime.utcnow()
             # If updatedAt needed: data['updatedAt'] = datetime.now()
-            
+
+            data = self.to_document()
+            data.pop('_id', None)
             result = collection.insert_one(data)
             self._id = result.inserted_id
-            
+
+        self._mark_clean()
         return self
 
     @classmethod
-    def findOne(cls, query):
+    def _projection(cls, projection=None, include_heavy=False):
+        # Heavy fields are left out unless the caller asks for them, like
+        # select: false in Mongoose. An explicit projection always wins.
+        if projection is not None:
+            return projection
+        if include_heavy or not cls.heavy_fields:
+            return None
+        return {field: 0 for field in cls.heavy_fields}
+
+    @classmethod
+    def _wrap(cls, data, lean=False):
+        if data is None or lean:
+            return data
+        return cls._from_document(data)
+
+    @classmethod
+    def findOne(cls, query, projection=None, lean=False, include_heavy=False):
         collection = cls.get_collection()
         # Convert string ID to ObjectId if needed
         if '_id' in query and isinstance(query['_id'], str):
             query['_id'] = ObjectId(query['_id'])
             
-        data = collection.find_one(query)
-        if data:
-            return cls(**data)
-        return None
+        data = collection.find_one(query, cls._projection(projection, include_heavy))
+        return cls._wrap(data, lean)
 
     @classmethod
-    def findById(cls, id):
+    def findById(cls, id, **kwargs):
         if isinstance(id, str):
             id = ObjectId(id)
-        return cls.findOne({'_id': id})
+        return cls.findOne({'_id': id}, **kwargs)
 
     @classmethod
-    def find(cls, query=None, projection=None, sort=None, limit=0, skip=0):
+    def iter_find(cls, query=None, projection=None, sort=None, limit=0, skip=0, batch_size=None, lean=False, include_heavy=False):
+        # Generator over the cursor: documents are wrapped one at a time and
+        # fetched batch_size at a time, so memory stays flat for big result sets.
         if query is None: query = {}
         collection = cls.get_collection()
-        
-        cursor = collection.find(query, projection)
+
+        cursor = collection.find(query, cls._projection(projection, include_heavy))
+        cursor = cursor.batch_size(batch_size or cls.default_batch_size)
         if sort:
             cursor = cursor.sort(sort)
         if skip:
             cursor = cursor.skip(skip)
         if limit:
             cursor = cursor.limit(limit)
-            
-        results = []
-        for doc in cursor:
-            results.append(cls(**doc))
-        return results
+
+        try:
+            for doc in cursor:
+                yield cls._wrap(doc, lean)
+        finally:
+            cursor.close()
 
     @classmethod
-    def findOneAndUpdate(cls, query, update, return_document=False, **kwargs):
+    def find(cls, query=None, projection=None, sort=None, limit=0, skip=0, lean=False, include_heavy=False):
+        return list(cls.iter_find(
+            query, projection=projection, sort=sort, limit=limit, skip=skip,
+            lean=lean, include_heavy=include_heavy
+        ))
+
+    @classmethod
+    def findOneAndUpdate(cls, query, update, return_document=False, projection=None, lean=False, include_heavy=False, **kwargs):
         collection = cls.get_collection()
         
         # Convert string ID to ObjectId if needed
@@ -89,12 +247,15 @@ class Model:
         # pymongo find_one_and_update returns the document *before* update by default
         # user return_document=True to get the new one
         from pymongo import ReturnDocument
-        return_doc = ReturnDocument.AFTER if return_document or kwargs.get('new') else ReturnDocument.BEFORE
+        return_doc = ReturnDocument.AFTER if return_document or kwargs.pop('new', False) else ReturnDocument.BEFORE
         
-        data = collection.find_one_and_update(query, update, return_document=return_doc, **kwargs)
-        if data:
-            return cls(**data)
-        return None
+        data = collection.find_one_and_update(
+            query, update,
+            projection=cls._projection(projection, include_heavy),
+            return_document=return_doc,
+            **kwargs
+        )
+        return cls._wrap(data, lean)
 
     @classmethod
     def findByIdAndUpdate(cls, id, update, **kwargs):
@@ -122,6 +283,38 @@ class Model:
         return collection.find_one_and_delete({'_id': id})
         
     @classmethod
-    def countDocuments(cls, query):
+    def countDocuments(cls, query, **kwargs):
         collection = cls.get_collection()
-        return collection.count_documents(query)
+        return collection.count_documents(query, **kwargs)
+
+    # Async counterparts for the ASGI serving mode (asgi.py). Same arguments
+    # and results, on the per-process AsyncMongoClient from config.db.
+
+    @classmethod
+    def get_async_collection(cls):
+        return get_async_db()[cls.collection_name]
+
+    @classmethod
+    async def afindOne(cls, query, projection=None, lean=False, include_heavy=False):
+        if '_id' in query and isinstance(query['_id'], str):
+            query['_id'] = ObjectId(query['_id'])
+        data = await cls.get_async_collection().find_one(query, cls._projection(projection, include_heavy))
+        return cls._wrap(data, lean)
+
+    @classmethod
+    async def afindOneAndUpdate(cls, query, update, return_document=False, projection=None, lean=False, include_heavy=False, **kwargs):
+        if '_id' in query and isinstance(query['_id'], str):
+            query['_id'] = ObjectId(query['_id'])
+        from pymongo import ReturnDocument
+        return_doc = ReturnDocument.AFTER if return_document or kwargs.pop('new', False) else ReturnDocument.BEFORE
+        data = await cls.get_async_collection().find_one_and_update(
+            query, update,
+            projection=cls._projection(projection, include_heavy),
+            return_document=return_doc,
+            **kwargs
+        )
+        return cls._wrap(data, lean)
+
+    @classmethod
+    async def acountDocuments(cls, query, **kwargs):
+        return await cls.get_async_collection().count_documents(query, **kwargs)
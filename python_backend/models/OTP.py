@@ -1,14 +1,18 @@
-from .Model import Model
 from datetime import datetime
+from pymongo import ASCENDING, IndexModel
+from config.env import Config
+from .Model import Model
 
 class OTP(Model):
     collection_name = 'otps'
-    
+    indexes = [
+        IndexModel([('email', ASCENDING)]),
+        # MongoDB removes OTPs on its own once they expire
+        IndexModel([('createdAt', ASCENDING)], expireAfterSeconds=Config.OTP_EXPIRY_MINUTES * 60)
+    ]
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         if not hasattr(self, 'createdAt'):
-            self.createdAt = datetime.now()
-            
-    # MongoDB TTL index should be set manually in DB or via a setup script.
-    # We can't easily enforce schema indexes in simple python class without an ODM like mongoengine or beanie.
-    # For now, we rely on existing DB or manual index creation.
+            # TTL indexes compare against UTC
+            self.createdAt = datetime.utcnow()
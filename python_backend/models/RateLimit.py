@@ -0,0 +1,35 @@
+import time
+from pymongo.errors import DuplicateKeyError
+from .Model import Model
+
+class RateLimit(Model):
+    # Token buckets shared by all workers (utils.rate_limit.SharedTokenBuckets),
+    # one document per key. Stored as the bucket's theoretical arrival time
+    # `tat` (GCRA): the time at which the bucket would be full again.
+    collection_name = 'ratelimits'
+
+    @classmethod
+    def reserve(cls, key, rate, capacity, max_wait=None):
+        # Same contract as TokenBucket.reserve(): the wait before the reserved
+        # token may be used, or None (nothing reserved) past max_wait. The
+        # document is updated compare-and-set on the tat read, so concurrent
+        # reservations from any process are serialized.
+        interval = 1.0 / rate
+        tolerance = (max(capacity, 1) - 1) * interval
+        collection = cls.get_collection()
+        while True:
+            now = time.time()
+            doc = collection.find_one({"_id": key}, {"tat": 1})
+            tat = doc['tat'] if doc else now
+            wait = max(0.0, tat - tolerance - now)
+            if max_wait is not None and wait > max_wait:
+                return None
+            new_tat = max(tat, now) + interval
+            if doc is None:
+                try:
+                    collection.insert_one({"_id": key, "tat": new_tat})
+                    return wait
+                except DuplicateKeyError:
+                    continue
+            if collection.update_one({"_id": key, "tat": tat}, {"$set": {"tat": new_tat}}).modified_count:
+                return wait
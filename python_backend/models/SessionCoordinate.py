@@ -0,0 +1,195 @@
+from datetime import datetime
+from pymongo import ASCENDING, IndexModel
+from .Model import Model
+from utils import coordinate_codec
+from utils.pagination import keyset_filter
+
+class SessionCoordinate(Model):
+    # One document per fix in a time-series collection (MongoDB 5.0+).
+    # Older servers get a plain collection with the same indexes.
+    collection_name = 'sessioncoordinates'
+    timeseries = {
+        'timeField': 'timestamp',
+        'metaField': 'meta',
+        'granularity': 'seconds'
+    }
+    indexes = [
+        IndexModel([('meta.sessionId', ASCENDING), ('timestamp', ASCENDING)]),
+        IndexModel([('meta.sessionId', ASCENDING), ('receivedAt', ASCENDING)]),
+        IndexModel([('meta.userId', ASCENDING)])
+    ]
+
+    # Fields returned to API clients, same shape as the old embedded array
+    public_projection = {'_id': 0, 'latitude': 1, 'longitude': 1, 'accuracy': 1, 'speed': 1, 'timestamp': 1}
+    # Plus the keys cursors page on, see next_cursor()
+    keyed_projection = dict(public_projection, _id=1, receivedAt=1)
+
+    @staticmethod
+    def _documents(session, coordinates):
+        meta = {
+            "sessionId": session._id,
+            "deviceId": getattr(session, 'deviceId', None),
+            "userId": getattr(session, 'userId', None)
+        }
+        # Milliseconds, what MongoDB keeps, so cursors compare exactly
+        received_at = datetime.utcnow()
+        received_at = received_at.replace(microsecond=received_at.microsecond // 1000 * 1000)
+        return [dict(c, meta=meta, receivedAt=received_at) for c in coordinates]
+
+    @staticmethod
+    def _stored_query(session, coordinates):
+        return {"meta.sessionId": session._id, "timestamp": {"$in": list({c['timestamp'] for c in coordinates})}}
+
+    @staticmethod
+    def _unseen(coordinates, stored):
+        # A fix is a repeat when the session already has one with the same
+        # timestamp and position (a retried upload), or earlier in the batch.
+        # Compared at the precision pack() keeps, so a per-fix document also
+        # matches its rounded copy in a session's coordinatesArchive.
+        seen = {coordinate_codec.fix_key(c) for c in stored}
+        fresh = []
+        for c in coordinates:
+            key = coordinate_codec.fix_key(c)
+            if key not in seen:
+                seen.add(key)
+                fresh.append(c)
+        return fresh
+
+    @classmethod
+    def without_stored(cls, session, coordinates):
+        if not coordinates:
+            return []
+        stored = cls.get_collection().find(cls._stored_query(session, coordinates), {'_id': 0, 'timestamp': 1, 'latitude': 1, 'longitude': 1})
+        return cls._unseen(coordinates, stored)
+
+    @classmethod
+    async def awithout_stored(cls, session, coordinates):
+        if not coordinates:
+            return []
+        cursor = cls.get_async_collection().find(cls._stored_query(session, coordinates), {'_id': 0, 'timestamp': 1, 'latitude': 1, 'longitude': 1})
+        return cls._unseen(coordinates, await cursor.to_list(None))
+
+    @classmethod
+    def append(cls, session, coordinates):
+        # Returns the ids of the stored fixes
+        if not coordinates:
+            return []
+        return cls.get_collection().insert_many(cls._documents(session, coordinates), ordered=True).inserted_ids
+
+    @classmethod
+    async def aappend(cls, session, coordinates):
+        if not coordinates:
+            return []
+        return (await cls.get_async_collection().insert_many(cls._documents(session, coordinates), ordered=True)).inserted_ids
+
+    @classmethod
+    def discard(cls, session, ids):
+        # Time-series deletes on _id need MongoDB 7.0 (OperationFailure before)
+        cls.get_collection().delete_many({"meta.sessionId": session._id, "_id": {"$in": ids}})
+
+    @classmethod
+    async def adiscard(cls, session, ids):
+        await cls.get_async_collection().delete_many({"meta.sessionId": session._id, "_id": {"$in": ids}})
+
+    @classmethod
+    def for_session(cls, session, since=None, include_legacy=True):
+        # All fixes of a session in time order, or only those after `since`
+        return [cls.public(c) for c in cls._fixes(session, since, include_legacy)]
+
+    @classmethod
+    def page(cls, session, since=None):
+        # (fixes after `since` in time order, cursor key for the next call)
+        fixes = cls._fixes(session, since)
+        return [cls.public(c) for c in fixes], cls.next_cursor(fixes, since)
+
+    @classmethod
+    def arrivals(cls, session, since=None):
+        # [(fix, its cursor key)] after `since`, in the order they arrived
+        return [(cls.public(c), cls.cursor_key(c)) for c in sorted(cls._fixes(session, since), key=cls._arrival)]
+
+    @classmethod
+    def for_sessions(cls, sessions):
+        # {session id: fixes} like for_session, with one query for all of
+        # them instead of one per session (exports)
+        stored = {}
+        if sessions:
+            cursor = (
+                cls.get_collection()
+                .find({"meta.sessionId": {"$in": [s._id for s in sessions]}}, dict(cls.public_projection, **{"meta.sessionId": 1}))
+                .sort("timestamp", ASCENDING)
+            )
+            for doc in cursor:
+                stored.setdefault(doc.pop('meta')['sessionId'], []).append(doc)
+        return {s._id: [cls.public(c) for c in cls._combine(s, stored.get(s._id, []))] for s in sessions}
+
+    # Cursors. Devices upload buffered fixes late and their clocks drift, so
+    # "after since" can't mean after a device timestamp: a backlog batch
+    # would sort before what the client has already seen. Each stored fix
+    # gets the server's receivedAt instead, and a cursor is the
+    # (receivedAt, _id) of the last fix received (a batch shares receivedAt
+    # and is inserted in order, so _id breaks the tie). A plain datetime
+    # `since` still filters on timestamp, for older clients and legacy fixes
+    # that have no receive time.
+
+    @staticmethod
+    def public(c):
+        return {key: value for key, value in c.items() if key not in ('_id', 'receivedAt')}
+
+    @staticmethod
+    def cursor_key(c):
+        return (c['receivedAt'], c.get('_id')) if c.get('receivedAt') else c['timestamp']
+
+    @staticmethod
+    def _arrival(c):
+        return (c.get('receivedAt') or c['timestamp'], str(c.get('_id') or ''))
+
+    @classmethod
+    def next_cursor(cls, fixes, since=None):
+        received = [c for c in fixes if c.get('receivedAt')]
+        if received:
+            return cls.cursor_key(max(received, key=cls._arrival))
+        if fixes:
+            return max(c['timestamp'] for c in fixes)
+        return since
+
+    @classmethod
+    def _fixes(cls, session, since=None, include_legacy=True):
+        query = {"meta.sessionId": session._id}
+        if isinstance(since, tuple):
+            query.update(keyset_filter("receivedAt", *since, ascending=True))
+        elif since is not None:
+            query["timestamp"] = {"$gt": since}
+        stored = list(
+            cls.get_collection()
+            .find(query, cls.keyed_projection)
+            .sort("timestamp", ASCENDING)
+        )
+        return cls._combine(session, stored, since, include_legacy)
+
+    @classmethod
+    def _combine(cls, session, stored, since=None, include_legacy=True):
+        # stored: the session's fixes from the collection, after `since`
+        archive = getattr(session, 'coordinatesArchive', None)
+        if archive:
+            # Completed session compacted by TriggerSession.archive_coordinates.
+            # Fixes can still land in the collection afterwards (late buffered
+            # uploads, or a crash before the packed ones were deleted).
+            archived = coordinate_codec.unpack(archive)
+            if isinstance(since, tuple):
+                archived = [c for c in archived if c.get('receivedAt') and c['receivedAt'] > since[0]]
+            elif since is not None:
+                archived = [c for c in archived if c['timestamp'] > since]
+            stored = sorted(archived + cls._unseen(stored, archived), key=lambda c: c['timestamp'])
+
+        # Sessions written before the time-series migration keep their fixes
+        # embedded. migrate_coordinates.py copies them before dropping the
+        # array, so skip the ones already copied. A cursor always comes after them.
+        legacy = (getattr(session, 'coordinates', None) or []) if include_legacy and not isinstance(since, tuple) else []
+        legacy = [
+            c for c in legacy
+            if c.get('timestamp') and c.get('latitude') is not None and c.get('longitude') is not None
+            and (since is None or c['timestamp'] > since)
+        ]
+        if not legacy:
+            return stored
+        return sorted(cls._unseen(legacy, stored) + stored, key=lambda c: c['timestamp'])
@@ -1,8 +1,38 @@
 from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
 from .Model import Model
+from .SessionCoordinate import SessionCoordinate
+from utils.geo import path_distance, bounding_box, haversine_expression
+from utils import coordinate_codec
 
 class TriggerSession(Model):
     collection_name = 'triggersessions'
+    indexes = [
+        IndexModel([('userId', ASCENDING), ('status', ASCENDING)]),
+        # Keyset pagination of history, with and without a device filter
+        IndexModel([('userId', ASCENDING), ('startTime', DESCENDING), ('_id', DESCENDING)]),
+        IndexModel([('userId', ASCENDING), ('deviceId', ASCENDING), ('startTime', DESCENDING), ('_id', DESCENDING)]),
+        # Only active sessions are looked up by device
+        IndexModel(
+            [('deviceId', ASCENDING)],
+            name='deviceId_active',
+            partialFilterExpression={'status': 'active'}
+        ),
+        # services.sms_dispatcher.recover() looks for unsent emergency SMS
+        IndexModel([('smsDeliveries.status', ASCENDING)], sparse=True)
+    ]
+    # Legacy sessions may still embed every fix; archived sessions hold them
+    # packed in coordinatesArchive
+    heavy_fields = ('coordinates', 'coordinatesArchive')
+
+    # Enough for listings; counts legacy fixes server side without sending them
+    summary_projection = {
+        'deviceId': 1, 'userId': 1, 'status': 1, 'startTime': 1, 'endTime': 1,
+        'manualStop': 1, 'coordinatesCount': 1, 'lastLocation': 1,
+        'firstFixTime': 1, 'lastFixTime': 1, 'bbox': 1, 'distance': 1, 'duration': 1,
+        'legacyCoordinatesCount': {'$size': {'$ifNull': ['$coordinates', []]}}
+    }
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -10,7 +40,219 @@ class TriggerSession(Model):
             self.status = 'active'
         if not hasattr(self, 'startTime'):
             self.startTime = datetime.now()
-        if not hasattr(self, 'coordinates'):
-            self.coordinates = []
+        if not hasattr(self, 'coordinatesCount'):
+            self.coordinatesCount = 0
         if not hasattr(self, 'manualStop'):
             self.manualStop = False
+
+    # Fixes live in the sessioncoordinates collection. Older sessions may still
+    # carry an embedded `coordinates` array until migrate_coordinates.py runs,
+    # so every reader goes through these helpers. The array is a heavy field:
+    # load with include_heavy=True when the fixes themselves are needed.
+
+    def get_coordinates(self, since=None):
+        return SessionCoordinate.for_session(self, since)
+
+    def get_coordinates_page(self, since=None):
+        # (coordinates, cursor key for the next `since`), see SessionCoordinate
+        return SessionCoordinate.page(self, since)
+
+    def get_coordinate_arrivals(self, since=None):
+        return SessionCoordinate.arrivals(self, since)
+
+    @staticmethod
+    def summary_count(doc):
+        # Works on lean documents loaded with summary_projection
+        return (doc.get('coordinatesCount') or 0) + (doc.get('legacyCoordinatesCount') or 0)
+
+    def coordinates_count(self):
+        legacy = len(getattr(self, 'coordinates', None) or []) or getattr(self, 'legacyCoordinatesCount', 0) or 0
+        return (getattr(self, 'coordinatesCount', 0) or 0) + legacy
+
+    def last_location(self):
+        last = getattr(self, 'lastLocation', None)
+        legacy = getattr(self, 'coordinates', None) or []
+        if legacy and (not last or legacy[-1].get('timestamp') > last.get('timestamp')):
+            return legacy[-1]
+        return last
+
+    @staticmethod
+    def _summary_update(coordinates):
+        # Pipeline keeping the summary fields (count, first/last fix, bounding
+        # box, distance, lastLocation) current against the document's own state
+        first = min(coordinates, key=lambda c: c['timestamp'])
+        latest = max(coordinates, key=lambda c: c['timestamp'])
+        box = bounding_box(coordinates)
+
+        def widen(field, value, op):
+            return {op: [{"$ifNull": [f"$bbox.{field}", value]}, value]}
+
+        # Line from the stored lastLocation to the first new fix, unless this is
+        # a late backlog: don't draw a line back from the newest fix
+        bridge = {"$cond": [
+            {"$and": [
+                {"$gt": ["$lastLocation.latitude", None]},
+                {"$lte": [{"$ifNull": ["$lastLocation.timestamp", datetime.min]}, first['timestamp']]}
+            ]},
+            haversine_expression("$lastLocation.latitude", "$lastLocation.longitude", first['latitude'], first['longitude']),
+            0
+        ]}
+
+        return [{"$set": {
+            "coordinatesCount": {"$add": [{"$ifNull": ["$coordinatesCount", 0]}, len(coordinates)]},
+            "firstFixTime": {"$min": [{"$ifNull": ["$firstFixTime", first['timestamp']]}, first['timestamp']]},
+            "lastFixTime": {"$max": [{"$ifNull": ["$lastFixTime", latest['timestamp']]}, latest['timestamp']]},
+            "bbox": {
+                "minLat": widen("minLat", box["minLat"], "$min"),
+                "maxLat": widen("maxLat", box["maxLat"], "$max"),
+                "minLng": widen("minLng", box["minLng"], "$min"),
+                "maxLng": widen("maxLng", box["maxLng"], "$max")
+            },
+            "distance": {"$add": [{"$ifNull": ["$distance", 0]}, path_distance(coordinates), bridge]},
+            # Pipeline update so a late backlog never replaces a newer lastLocation
+            "lastLocation": {"$cond": [
+                {"$gt": [latest['timestamp'], {"$ifNull": ["$lastLocation.timestamp", datetime.min]}]},
+                {"$literal": latest},
+                "$lastLocation"
+            ]}
+        }}]
+
+    # Ingest writes the fixes first and folds them into the summary after,
+    # so a crash in between leaves the summary short (rebuild_summary repairs
+    # it) instead of counting fixes that were never stored. The summary
+    # update carries the active check: when it finds the session stopped,
+    # the fixes just stored are taken back. Fixes the session already has
+    # are skipped, so a retried upload isn't counted twice; two copies of
+    # the same upload racing each other can still both land. Callers pass
+    # deduplicate=False for uploads that can't be a retry (one fix stamped
+    # by the server), saving the lookup.
+    _ingest_projection = {"deviceId": 1, "userId": 1, "coordinatesCount": 1}
+
+    @classmethod
+    def record_coordinates(cls, session, coordinates, active_only=True, deduplicate=True):
+        # Returns the updated session, or None when active_only and the
+        # session has stopped (nothing is kept then). The fixes are tagged
+        # with session.deviceId and session.userId.
+        query = {"_id": session._id}
+        if active_only:
+            query["status"] = "active"
+
+        fresh = SessionCoordinate.without_stored(session, coordinates) if deduplicate else coordinates
+        if not fresh:
+            return cls.findOne(query, projection=cls._ingest_projection)
+
+        ids = SessionCoordinate.append(session, fresh)
+        updated = cls.findOneAndUpdate(query, cls._summary_update(fresh), return_document=True)
+        if updated is not None:
+            return updated
+        try:
+            SessionCoordinate.discard(session, ids)
+        except OperationFailure:
+            # Can't take them back: keep them as late fixes of the session
+            if active_only:
+                return cls.findOneAndUpdate({"_id": session._id}, cls._summary_update(fresh), return_document=True)
+        return None
+
+    @classmethod
+    async def arecord_coordinates(cls, session, coordinates, active_only=True, deduplicate=True):
+        # record_coordinates for asgi.py
+        query = {"_id": session._id}
+        if active_only:
+            query["status"] = "active"
+
+        fresh = await SessionCoordinate.awithout_stored(session, coordinates) if deduplicate else coordinates
+        if not fresh:
+            return await cls.afindOne(query, projection=cls._ingest_projection)
+
+        ids = await SessionCoordinate.aappend(session, fresh)
+        updated = await cls.afindOneAndUpdate(query, cls._summary_update(fresh), return_document=True)
+        if updated is not None:
+            return updated
+        try:
+            await SessionCoordinate.adiscard(session, ids)
+        except OperationFailure:
+            if active_only:
+                return await cls.afindOneAndUpdate({"_id": session._id}, cls._summary_update(fresh), return_document=True)
+        return None
+
+    @classmethod
+    def rebuild_summary(cls, session, drop_legacy=False):
+        # Recomputes the summary fields from the stored fixes, for sessions
+        # whose incremental summary is off (interrupted ingest, migration).
+        # Load the session with include_heavy=True so legacy and archived
+        # fixes are seen. drop_legacy removes the embedded array in the same
+        # update, once its fixes have been copied (migrate_coordinates.py).
+        stored = SessionCoordinate.for_session(session, include_legacy=False)
+        coordinates = stored if drop_legacy else SessionCoordinate.for_session(session)
+        fields = {
+            # Legacy fixes are counted separately (summary_count)
+            "coordinatesCount": len(stored),
+            "firstFixTime": coordinates[0]['timestamp'] if coordinates else None,
+            "lastFixTime": coordinates[-1]['timestamp'] if coordinates else None,
+            "bbox": bounding_box(coordinates) if coordinates else None,
+            "distance": path_distance(coordinates),
+            "lastLocation": coordinates[-1] if coordinates else None
+        }
+        update = {"$set": fields}
+        if drop_legacy:
+            update["$unset"] = {"coordinates": ""}
+        return cls.findOneAndUpdate({"_id": session._id}, update, return_document=True)
+
+    @classmethod
+    def archive_coordinates(cls, session):
+        # Packs a completed session's time-series fixes into one compact
+        # document field (see utils.coordinate_codec) and drops the per-fix
+        # documents that were packed. Readers merge the archive with any
+        # per-fix documents left over (inserted since, or not yet deleted
+        # after a crash), so nothing is lost between the steps.
+        fixes = list(
+            SessionCoordinate.get_collection()
+            .find({"meta.sessionId": session._id}, SessionCoordinate.keyed_projection)
+            .sort("timestamp", ASCENDING)
+        )
+        if not fixes:
+            return 0
+        current = cls.findOne({"_id": session._id}, projection={"coordinatesArchive": 1}, lean=True) or {}
+        archive = current.get('coordinatesArchive')
+        if archive:
+            # Archived before: fold the leftovers in
+            packed = coordinate_codec.unpack(archive)
+            fixes = sorted(packed + SessionCoordinate._unseen(fixes, packed), key=lambda c: c['timestamp'])
+        archived = cls.findOneAndUpdate(
+            {"_id": session._id, "status": {"$ne": "active"}, "coordinatesArchive": archive},
+            {"$set": {"coordinatesArchive": coordinate_codec.pack(fixes)}},
+            projection={"_id": 1}, lean=True
+        )
+        if not archived:
+            return 0
+
+        # Only the documents read above: others may have arrived meanwhile
+        ids = [c['_id'] for c in fixes if c.get('_id')]
+        try:
+            for i in range(0, len(ids), 1000):
+                SessionCoordinate.get_collection().delete_many({"meta.sessionId": session._id, "_id": {"$in": ids[i:i + 1000]}})
+        except OperationFailure as err:
+            # Time-series deletes on fields other than meta need MongoDB 7.0.
+            # The documents stay; readers and the next run match them to
+            # their packed copies (SessionCoordinate._unseen) and drop them.
+            print(f'Archived fixes of {session._id} kept in {SessionCoordinate.collection_name}: {err}')
+        return len(fixes)
+
+    @staticmethod
+    def summarize(doc, coordinates_count=None):
+        # Summary block for API responses; works on lean summary documents
+        end = doc.get('endTime')
+        duration = doc.get('duration')
+        if duration is None and end and doc.get('startTime'):
+            duration = (end - doc['startTime']).total_seconds()
+        return {
+            "coordinatesCount": TriggerSession.summary_count(doc) if coordinates_count is None else coordinates_count,
+            "firstFixTime": doc.get('firstFixTime'),
+            "lastFixTime": doc.get('lastFixTime'),
+            "bbox": doc.get('bbox'),
+            "distance": round(doc.get('distance') or 0, 1),
+            "duration": duration
+        }
+
+    def summary(self):
+        return self.summarize(self.to_document(), self.coordinates_count())
@@ -1,8 +1,20 @@
-import bcrypt
+from pymongo import ASCENDING, IndexModel
+from services.password_service import password_hasher
+from utils.passwords import is_hashed
 from .Model import Model
 
 class User(Model):
     collection_name = 'users'
+    indexes = [
+        IndexModel([('userID', ASCENDING)], unique=True),
+        IndexModel([('email', ASCENDING)], unique=True),
+        # Only needed while legacy embedded tokens are being migrated
+        IndexModel([('tokens.token', ASCENDING)])
+    ]
+    # Legacy embedded login tokens, see migrate_tokens.py
+    heavy_fields = ('tokens',)
+    # What auth_required loads and caches for request.user
+    principal_projection = {'password': 0, 'tokens': 0, 'otp': 0, 'otpExpires': 0}
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -11,26 +23,26 @@ class User(Model):
             self.verified = False
         if not hasattr(self, 'deviceIds'):
             self.deviceIds = []
-        if not hasattr(self, 'tokens'):
-            self.tokens = []
 
-    def save(self):
+    def save(self, replace=False):
         # Handle password hashing
-        if hasattr(self, 'password') and self.password and not self.password.startswith(b'$2b$'.decode('utf-8')) and not self.password.startswith('$2b$'):
-            # Check if it's already hashed (mock check, real world needs better state tracking)
-            # In Mongoose, isModified check is used. Here, we assume if we are saving and it looks like plain text...
-            # A better way is to use a flag or method `set_password`. 
-            # For this conversion, we'll hash if it doesn't look like a bcrypt hash.
-            # standard bcrypt hash is 60 chars.
-            if len(self.password) != 60: 
-                self.password = bcrypt.hashpw(self.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        if hasattr(self, 'password') and self.password and not is_hashed(self.password):
+            # In Mongoose, isModified check is used. Here, a value that doesn't
+            # look like a bcrypt hash is treated as a new plain text password.
+            self.password = password_hasher.hash(self.password)
         
-        return super().save()
+        return super().save(replace=replace)
 
     def compare_password(self, candidate_password):
-        if not hasattr(self, 'password'):
+        if not getattr(self, 'password', None):
             return False
-        return bcrypt.checkpw(candidate_password.encode('utf-8'), self.password.encode('utf-8'))
+        if not password_hasher.verify(candidate_password, self.password):
+            return False
+        if password_hasher.needs_rehash(self.password):
+            # BCRYPT_ROUNDS changed since this hash was stored
+            self.password = password_hasher.hash(candidate_password)
+            User.findOneAndUpdate({"_id": self._id}, {"$set": {"password": self.password}}, projection={"_id": 1}, lean=True)
+        return True
 
     # Helper alias to match JS code where possible, or update controller to use compare_password
     async def comparePassword(self, candidate_password):
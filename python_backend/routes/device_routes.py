@@ -8,7 +8,7 @@ from validations.device_validation import (
     CreateDeviceSchema
 )
 from validations.session_validation import (
-    StartTriggerSchema, AddCoordinatesSchema, StopTriggerSchema
+    StartTriggerSchema, AddCoordinatesSchema, AddCoordinatesBatchSchema, StopTriggerSchema
 )
 
 device_bp = Blueprint('device', __name__)
@@ -23,5 +23,6 @@ device_bp.add_url_rule('/<device_id>/trigger-words', view_func=auth_required(val
 # Device endpoints (Device Auth)
 device_bp.add_url_rule('/trigger/start', view_func=device_auth_required(validate(StartTriggerSchema())(session_controller.start_trigger)), methods=['POST'])
 device_bp.add_url_rule('/coordinates/add', view_func=device_auth_required(validate(AddCoordinatesSchema())(session_controller.add_coordinates)), methods=['POST'])
+device_bp.add_url_rule('/coordinates/batch', view_func=device_auth_required(validate(AddCoordinatesBatchSchema())(session_controller.add_coordinates_batch)), methods=['POST'])
 device_bp.add_url_rule('/trigger/stop', view_func=device_auth_required(validate(StopTriggerSchema())(session_controller.stop_trigger)), methods=['POST'])
 device_bp.add_url_rule('/create', view_func=device_auth_required(validate(CreateDeviceSchema())(device_controller.create_device)), methods=['POST'])
@@ -1,6 +1,28 @@
-from .email_service import send_otp_email, send_password_reset_email
-from .otp_service import generate_otp, get_otp_expiry, send_verification_otp, send_reset_otp
-from .token_service import generate_auth_token, verify_token
-# from .sms_service import sms_service # Import instance 
-# Need to decide if we export class or instance. Node exported new SMSService()
-from .sms_service import sms_service as smsService
+import importlib
+
+# Package-level names, resolved from their submodule on first access so that
+# importing one service (e.g. services.token_service) doesn't load the email
+# and SMS provider SDKs
+_exports = {
+    'send_otp_email': ('email_service', 'send_otp_email'),
+    'send_password_reset_email': ('email_service', 'send_password_reset_email'),
+    'generate_otp': ('otp_service', 'generate_otp'),
+    'get_otp_expiry': ('otp_service', 'get_otp_expiry'),
+    'send_verification_otp': ('otp_service', 'send_verification_otp'),
+    'send_reset_otp': ('otp_service', 'send_reset_otp'),
+    'generate_auth_token': ('token_service', 'generate_auth_token'),
+    'verify_token': ('token_service', 'verify_token'),
+    # Node exported new SMSService()
+    'smsService': ('sms_service', 'sms_service'),
+}
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, attr = _exports[name]
+    value = getattr(importlib.import_module(f'.{module}', __name__), attr)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_exports))
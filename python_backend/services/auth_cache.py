@@ -0,0 +1,62 @@
+import copy
+import time
+from config.env import Config
+from utils.cache import TTLCache
+from .token_store import token_store
+
+class AuthCache:
+    # Maps a verified token to the owning user's document (without password
+    # or tokens) so authenticated requests skip the users lookup. Entries are
+    # per worker and tagged with the token's version from the shared token
+    # store. A principal whose version was confirmed less than
+    # `recheck` seconds ago is used as is, so a busy token costs no database
+    # round trip at all; after that the middleware reads the version again.
+    # Revocations and invalidate_user() (which bumps the version) apply on
+    # this worker at once and on the others within `recheck` seconds.
+
+    def __init__(self, maxsize, ttl, recheck):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.recheck = recheck
+
+    def current(self, token):
+        # The principal if its version was confirmed within `recheck` seconds
+        entry = self._cache.get(token)
+        if entry is None or time.monotonic() - entry[2] >= self.recheck:
+            return None
+        return copy.deepcopy(entry[0])
+
+    def get(self, token, version):
+        entry = self._cache.get(token)
+        if entry is None or entry[1] != version:
+            return None
+        entry[2] = time.monotonic()
+        # Controllers may mutate the user they get, never hand out the cached copy
+        return copy.deepcopy(entry[0])
+
+    def put(self, token, principal, version, expires_at=None):
+        if not self._cache.ttl:
+            return
+        ttl = self._cache.ttl
+        if expires_at:
+            # Never keep a token around longer than the JWT itself is valid
+            ttl = min(ttl, expires_at - time.time())
+            if ttl <= 0:
+                return
+        self._cache.set(token, [copy.deepcopy(principal), version, time.monotonic()], ttl=ttl)
+
+    def invalidate_token(self, token):
+        self._cache.pop(token)
+
+    def invalidate_user(self, user_id):
+        # Here right away, on other workers through the token version
+        token_store.touch_user(user_id)
+        user_id = str(user_id)
+        return self._cache.remove_where(lambda token, entry: str(entry[0].get('_id')) == user_id)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+auth_cache = AuthCache(Config.AUTH_CACHE_MAX_SIZE, Config.AUTH_CACHE_TTL_SECONDS, Config.AUTH_RECHECK_SECONDS)
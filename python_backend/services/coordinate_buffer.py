@@ -0,0 +1,181 @@
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+from config.env import Config
+from models.Device import Device
+from models.TriggerSession import TriggerSession
+from .location_broker import location_broker
+from .session_registry import session_registry
+
+class CoordinateBuffer:
+    # Write-behind ingestion (INGEST_MODE=buffered). Validated fixes are kept
+    # per session in memory and written in bulk by a background thread every
+    # flush_interval seconds, or as soon as a session has flush_size fixes:
+    # one summary update, one insert_many and one Device update per session
+    # per flush instead of per request.
+    #
+    # Loss is bounded: at most max_buffered fixes per worker are held at any
+    # time. Beyond that the request thread flushes inline (backpressure)
+    # rather than dropping, and buffers are flushed at shutdown and before a
+    # session is stopped. Only a hard crash loses what was still buffered.
+
+    def __init__(self, flush_interval, flush_size, max_buffered):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_buffered = max_buffered
+        self._buffers = {}
+        self._buffered = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self.flushed = 0
+        self.flushes = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def _ensure_started(self):
+        # Threads don't survive a fork, so start the flusher in each worker
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._buffers = {}
+            self._buffered = 0
+            self._wake = threading.Event()
+            threading.Thread(target=self._run, name='coordinate-flush', daemon=True).start()
+            self._pid = os.getpid()
+
+    def add(self, device_id, entry, coordinates):
+        self._ensure_started()
+        key = str(entry['sessionId'])
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = self._buffers[key] = {"deviceId": device_id, "entry": entry, "coordinates": []}
+            buffer["coordinates"].extend(coordinates)
+            self._buffered += len(coordinates)
+            full = self._buffered >= self.max_buffered
+            due = len(buffer["coordinates"]) >= self.flush_size
+
+        if full:
+            self.flush()
+        elif due:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Coordinate flush error: {e}")
+
+    def _take(self, device_id=None):
+        with self._lock:
+            if device_id is None:
+                taken, self._buffers = self._buffers, {}
+            else:
+                keys = [k for k, b in self._buffers.items() if b["deviceId"] == device_id]
+                taken = {k: self._buffers.pop(k) for k in keys}
+            self._buffered -= sum(len(b["coordinates"]) for b in taken.values())
+        return taken
+
+    def flush(self, device_id=None):
+        # Writes everything buffered (or just one device's fixes); returns the
+        # number of fixes written
+        with self._flush_lock:
+            taken = self._take(device_id)
+            if not taken:
+                return 0
+            written = 0
+            for key, buffer in taken.items():
+                coordinates = sorted(buffer["coordinates"], key=lambda c: c['timestamp'])
+                try:
+                    entry = self._write(buffer["deviceId"], buffer["entry"], coordinates)
+                    if entry is None:
+                        # Session deleted meanwhile
+                        self.dropped += len(coordinates)
+                        continue
+                    Device.findOneAndUpdate({"deviceId": buffer["deviceId"]}, {"$set": {"lastActive": datetime.utcnow()}}, projection={"_id": 1}, lean=True)
+                except Exception as e:
+                    self.failures += 1
+                    print(f"Failed to flush {len(coordinates)} coordinates of {key}: {e}")
+                    self._requeue(key, buffer, coordinates)
+                    continue
+                location_broker.publish(entry['sessionId'])
+                written += len(coordinates)
+            self.flushed += written
+            self.flushes += 1
+            return written
+
+    def _write(self, device_id, entry, coordinates):
+        # Returns the registry entry the fixes were written to
+        def record(target, active_only):
+            session = TriggerSession._from_document({
+                "_id": target['sessionId'],
+                "deviceId": device_id,
+                "userId": target.get('userId')
+            })
+            return TriggerSession.record_coordinates(session, coordinates, active_only=active_only)
+
+        if record(entry, True) is not None:
+            return entry
+
+        # Stopped since the fixes were accepted. If the cached entry was stale
+        # and the device has moved on to a newer session, the fixes belong to
+        # that one; otherwise they are late fixes of the stopped session.
+        session_registry.invalidate(device_id)
+        current = session_registry.get(device_id)
+        if current and current['sessionId'] != entry['sessionId'] and coordinates[0]['timestamp'] >= current['startTime']:
+            if record(current, True) is not None:
+                return current
+        return entry if record(entry, False) is not None else None
+
+    def _requeue(self, key, buffer, coordinates):
+        # Retried on the next flush while there is room, dropped beyond that
+        with self._lock:
+            room = max(self.max_buffered - self._buffered, 0)
+            kept = coordinates[-room:] if room else []
+            self.dropped += len(coordinates) - len(kept)
+            if not kept:
+                return
+            current = self._buffers.get(key)
+            if current is None:
+                current = self._buffers[key] = {"deviceId": buffer["deviceId"], "entry": buffer["entry"], "coordinates": []}
+            current["coordinates"][:0] = kept
+            self._buffered += len(kept)
+
+    def pending(self, device_id=None):
+        with self._lock:
+            return sum(
+                len(b["coordinates"]) for b in self._buffers.values()
+                if device_id is None or b["deviceId"] == device_id
+            )
+
+    def metrics(self):
+        return {
+            "buffered": self._buffered,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "dropped": self.dropped
+        }
+
+    def shutdown(self):
+        if self._pid == os.getpid():
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Coordinate flush on shutdown failed: {e}")
+
+coordinate_buffer = CoordinateBuffer(
+    flush_interval=Config.INGEST_FLUSH_INTERVAL_MS / 1000.0,
+    flush_size=Config.INGEST_FLUSH_SIZE,
+    max_buffered=Config.INGEST_MAX_BUFFERED
+)
+atexit.register(coordinate_buffer.shutdown)
@@ -0,0 +1,183 @@
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from pymongo import ASCENDING
+from config.env import Config
+from models.EmailOutbox import EmailOutbox
+from . import email_service
+
+class EmailOutboxWorker:
+    # Signup and reset mails are written to the emailoutbox collection and
+    # acknowledged right away; background threads claim them in batches,
+    # send through Resend and retry with exponential backoff. Because the
+    # queue is in MongoDB, mail survives restarts and any worker can send it.
+
+    def __init__(self, workers, batch_size, poll_interval, max_attempts, retry_backoff, lease_seconds):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.lease_seconds = lease_seconds
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._latencies = deque(maxlen=500)
+        self._queue_latencies = deque(maxlen=500)
+        self.sent = 0
+        self.failed = 0
+
+    def start(self):
+        # Threads don't survive a fork, so each process starts its own
+        if self.workers <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._wake = threading.Event()
+            for i in range(self.workers):
+                threading.Thread(target=self._run, name=f'email-outbox-{i}', daemon=True).start()
+            self._pid = os.getpid()
+
+    def enqueue(self, kind, params):
+        now = datetime.utcnow()
+        message = EmailOutbox(
+            kind=kind,
+            params=params,
+            to=params.get('to'),
+            status='pending',
+            attempts=0,
+            nextAttemptAt=now,
+            createdAt=now
+        ).save()
+        self.start()
+        self._wake.set()
+        return message._id
+
+    def deliver(self, kind, params):
+        # Entry point for controllers/services: queue, or send right away when
+        # EMAIL_DELIVERY=inline. Returns False only if an inline send failed.
+        if Config.EMAIL_DELIVERY == 'inline':
+            try:
+                email_service.send_email(params)
+                return True
+            except Exception as e:
+                print(f"❌ Resend Exception {kind}: {e}")
+                return False
+        self.enqueue(kind, params)
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                batch = self._claim_batch()
+                if batch:
+                    self._send(batch)
+                    continue
+            except Exception as e:
+                print(f"Email outbox error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _claim_batch(self):
+        now = datetime.utcnow()
+        claimable = {"$or": [
+            {"status": "pending", "nextAttemptAt": {"$lte": now}},
+            # Lease ran out: the worker that claimed it died mid-send
+            {"status": "sending", "leaseUntil": {"$lt": now}}
+        ]}
+        batch = []
+        while len(batch) < self.batch_size:
+            message = EmailOutbox.findOneAndUpdate(
+                claimable,
+                {
+                    "$set": {"status": "sending", "leaseUntil": now + timedelta(seconds=self.lease_seconds)},
+                    "$inc": {"attempts": 1}
+                },
+                sort=[("nextAttemptAt", ASCENDING)],
+                return_document=True,
+                lean=True
+            )
+            if not message:
+                break
+            batch.append(message)
+        return batch
+
+    def _send(self, batch):
+        started = time.monotonic()
+        try:
+            if len(batch) == 1:
+                ids = [email_service.send_email(batch[0]['params'])]
+            else:
+                ids = email_service.send_batch([m['params'] for m in batch])
+        except Exception as e:
+            self._latencies.append(time.monotonic() - started)
+            for message in batch:
+                self._mark_failed(message, e)
+            return
+
+        self._latencies.append(time.monotonic() - started)
+        now = datetime.utcnow()
+        for i, message in enumerate(batch):
+            provider_id = ids[i] if i < len(ids) else None
+            EmailOutbox.findOneAndUpdate(
+                {"_id": message['_id']},
+                # The html carries the OTP, which isn't kept once the mail is out
+                {"$set": {"status": "sent", "sentAt": now, "providerId": provider_id}, "$unset": {"leaseUntil": "", "params.html": ""}},
+                projection={"_id": 1}, lean=True
+            )
+            self._queue_latencies.append((now - message['createdAt']).total_seconds())
+            self.sent += 1
+
+    def _mark_failed(self, message, error):
+        attempts = message.get('attempts', 1)
+        update = {"lastError": str(error)}
+        unset = {"leaseUntil": ""}
+        if attempts >= self.max_attempts:
+            update["status"] = "failed"
+            unset["params.html"] = ""
+            self.failed += 1
+            print(f"❌ Giving up on {message.get('kind')} email to {message.get('to')}: {error}")
+        else:
+            update["status"] = "pending"
+            update["nextAttemptAt"] = datetime.utcnow() + timedelta(seconds=self.retry_backoff * (2 ** (attempts - 1)))
+        EmailOutbox.findOneAndUpdate(
+            {"_id": message['_id']},
+            {"$set": update, "$unset": unset},
+            projection={"_id": 1}, lean=True
+        )
+
+    def metrics(self):
+        def summarize(samples):
+            if not samples:
+                return None
+            ordered = sorted(samples)
+            return {
+                "avgMs": round(sum(ordered) / len(ordered) * 1000, 1),
+                "p95Ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 1),
+                "maxMs": round(ordered[-1] * 1000, 1)
+            }
+
+        try:
+            queue_depth = EmailOutbox.countDocuments({"status": {"$in": ["pending", "sending"]}})
+        except Exception:
+            queue_depth = None
+
+        return {
+            "queueDepth": queue_depth,
+            "sent": self.sent,
+            "failed": self.failed,
+            "sendLatency": summarize(list(self._latencies)),
+            "queueLatency": summarize(list(self._queue_latencies))
+        }
+
+email_outbox = EmailOutboxWorker(
+    workers=Config.EMAIL_WORKERS,
+    batch_size=Config.EMAIL_BATCH_SIZE,
+    poll_interval=Config.EMAIL_POLL_INTERVAL_SECONDS,
+    max_attempts=Config.EMAIL_MAX_ATTEMPTS,
+    retry_backoff=Config.EMAIL_RETRY_BACKOFF_SECONDS,
+    lease_seconds=Config.EMAIL_LEASE_SECONDS
+)
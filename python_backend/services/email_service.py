@@ -1,33 +1,60 @@
-import resend
 from config.env import Config
 
-resend.api_key = Config.RESEND_API_KEY
+_resend = None
+
+def resend_client():
+    # The Resend SDK (and requests under it) is imported on first send
+    global _resend
+    if _resend is None:
+        import resend
+        resend.api_key = Config.RESEND_API_KEY
+        _resend = resend
+    return _resend
 
 def get_from():
     return f"{Config.RESEND_FROM_NAME} <{Config.RESEND_FROM_ADDRESS}>"
 
+def build_otp_email(email, otp):
+    return {
+        "from": get_from(),
+        "to": email,
+        "subject": "Your MITR SOS Verification Code",
+        "html": f"""
+            <h2>Your Verification Code</h2>
+            <p>Your OTP is:</p>
+            <h1>{otp}</h1>
+            <p>Expires in {Config.OTP_EXPIRY_MINUTES} minutes.</p>
+        """
+    }
+
+def build_password_reset_email(email, otp):
+    return {
+        "from": get_from(),
+        "to": email,
+        "subject": "MITR SOS Password Reset",
+        "html": f"""
+            <h2>Password Reset</h2>
+            <p>Your reset OTP is:</p>
+            <h1>{otp}</h1>
+            <p>This code expires in {Config.OTP_EXPIRY_MINUTES} minutes.</p>
+        """
+    }
+
+def send_email(params):
+    # Raises on provider errors, returns the Resend message id
+    response = resend_client().Emails.send(params)
+    return response.get('id') if isinstance(response, dict) else None
+
+def send_batch(params_list):
+    # One Resend API call for several messages; all succeed or all fail
+    response = resend_client().Batch.send(params_list)
+    data = response.get('data') if isinstance(response, dict) else None
+    return [item.get('id') for item in data or []]
+
 def send_otp_email(email, otp):
     try:
-        from_address = get_from()
-        print(f"Sending OTP from: {from_address}")
-        
-        params = {
-            "from": from_address,
-            "to": email,
-            "subject": "Your MITR SOS Verification Code",
-            "html": f"""
-                <h2>Your Verification Code</h2>
-                <p>Your OTP is:</p>
-                <h1>{otp}</h1>
-                <p>Expires in {Config.OTP_EXPIRY_MINUTES} minutes.</p>
-            """
-        }
-        
-        email_resp = resend.Emails.send(params)
-        
-        # Resend SDK returns a dict, usually check 'id' or error
-        # If error occurs, it might raise exception or return error object depending on version
-        # Assuming success if no exception for now or checking return structure
+        print(f"Sending OTP from: {get_from()}")
+        send_email(build_otp_email(email, otp))
         return True
     except Exception as e:
         print(f"❌ Resend Exception OTP: {e}")
@@ -35,22 +62,8 @@ def send_otp_email(email, otp):
 
 def send_password_reset_email(email, otp):
     try:
-        from_address = get_from()
-        print(f"Sending Reset OTP from: {from_address}")
-        
-        params = {
-            "from": from_address,
-            "to": email,
-            "subject": "MITR SOS Password Reset",
-            "html": f"""
-                <h2>Password Reset</h2>
-                <p>Your reset OTP is:</p>
-                <h1>{otp}</h1>
-                <p>This code expires in {Config.OTP_EXPIRY_MINUTES} minutes.</p>
-            """
-        }
-        
-        resend.Emails.send(params)
+        print(f"Sending Reset OTP from: {get_from()}")
+        send_email(build_password_reset_email(email, otp))
         return True
     except Exception as e:
         print(f"❌ Resend Exception Reset: {e}")
@@ -0,0 +1,30 @@
+import threading
+from utils.cache import TTLCache
+
+class LocationBroker:
+    # Wakes live-stream subscribers in this process as soon as a session gets
+    # new fixes or stops. It only carries a version number: subscribers always
+    # re-read the database, and poll on a timer to catch changes made by other
+    # workers, so nothing is lost if a notification is missed. An evicted
+    # version just causes one spurious wake-up.
+
+    def __init__(self, maxsize=10000, ttl=3600):
+        self._versions = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._condition = threading.Condition()
+
+    def version(self, session_id):
+        return self._versions.get(str(session_id), 0)
+
+    def publish(self, session_id):
+        key = str(session_id)
+        with self._condition:
+            self._versions.set(key, self._versions.get(key, 0) + 1)
+            self._condition.notify_all()
+
+    def wait(self, session_id, version, timeout):
+        # True if the session changed since `version`, False on timeout
+        key = str(session_id)
+        with self._condition:
+            return self._condition.wait_for(lambda: self._versions.get(key, 0) != version, timeout)
+
+location_broker = LocationBroker()
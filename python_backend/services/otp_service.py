@@ -1,7 +1,8 @@
 import random
 from datetime import datetime, timedelta
 from config.env import Config
-from .email_service import send_otp_email, send_password_reset_email
+from .email_service import build_otp_email, build_password_reset_email
+from .email_outbox import email_outbox
 
 def generate_otp():
     return str(random.randint(100000, 999999))
@@ -11,10 +12,18 @@ def get_otp_expiry():
     return datetime.now() + timedelta(minutes=minutes)
 
 
+def _show_queued_otp(email, otp):
+    # In outbox mode deliver() returns once the mail is queued, before any
+    # send is attempted, so a failure can't fall back to the overrides
+    # below. Development logs the code up front instead.
+    if Config.NODE_ENV == 'development' and Config.EMAIL_DELIVERY == 'outbox':
+        print(f"🔑 Development: OTP queued for {email} is: {otp}")
+
 def send_verification_otp(email):
     try:
         otp = generate_otp()
-        sent = send_otp_email(email, otp)
+        _show_queued_otp(email, otp)
+        sent = email_outbox.deliver('otp', build_otp_email(email, otp))
         
         if not sent:
             if Config.NODE_ENV == 'development':
@@ -37,7 +46,8 @@ def send_verification_otp(email):
 def send_reset_otp(email):
     try:
         otp = generate_otp()
-        sent = send_password_reset_email(email, otp)
+        _show_queued_otp(email, otp)
+        sent = email_outbox.deliver('password_reset', build_password_reset_email(email, otp))
         
         if not sent:
             if Config.NODE_ENV == 'development':
@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config.env import Config
+from utils.api_error import ApiError
+from utils import passwords
+
+class PasswordHasher:
+    # Runs bcrypt inline (pool_size=0, the default) or in a small process
+    # pool. At most pool_size + queue_size calls are in flight; beyond that
+    # callers wait up to queue_timeout and then get a 503.
+
+    def __init__(self, rounds, pool_size, queue_size, queue_timeout):
+        self.rounds = rounds
+        self.pool_size = pool_size
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max(pool_size + queue_size, 1))
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        # Pools don't survive a fork, so each worker process creates its own.
+        # Spawned children are fresh interpreters: they re-import the
+        # parent's __main__ module (as __mp_main__) before utils.passwords,
+        # so entry points must keep start-up code under a __main__ guard.
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.pool_size,
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+                    self._pid = os.getpid()
+        return self._pool
+
+    def _run(self, fn, *args):
+        if self.pool_size <= 0:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise ApiError(503, 'Server busy, please try again')
+        try:
+            pool = self._get_pool()
+            try:
+                return pool.submit(fn, *args).result()
+            except BrokenProcessPool:
+                # A worker died; replace the pool and retry once
+                self._replace(pool)
+                return self._get_pool().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def _replace(self, broken):
+        # Threads that hit the same broken pool replace it only once
+        with self._lock:
+            if self._pool is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+                self._pid = None
+
+    def hash(self, password):
+        return self._run(passwords.hash_password, password, self.rounds)
+
+    def verify(self, password, hashed):
+        if not password or not hashed:
+            return False
+        return self._run(passwords.check_password, password, hashed)
+
+    def needs_rehash(self, hashed):
+        return passwords.hash_rounds(hashed) != self.rounds
+
+    def shutdown(self):
+        if self._pool and self._pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+        self._pid = None
+
+password_hasher = PasswordHasher(
+    rounds=Config.BCRYPT_ROUNDS,
+    pool_size=Config.BCRYPT_POOL_SIZE,
+    queue_size=Config.BCRYPT_QUEUE_SIZE,
+    queue_timeout=Config.BCRYPT_QUEUE_TIMEOUT_SECONDS
+)
@@ -0,0 +1,157 @@
+from abc import ABC, abstractmethod
+import threading
+from config.env import Config
+from models.ActiveSession import ActiveSession
+from models.TriggerSession import TriggerSession
+from utils.cache import TTLCache
+
+class SessionRegistry(ABC):
+    # Which session is active on which device, shared across workers through
+    # the backend (SESSION_REGISTRY) with a short per-worker read-through
+    # cache in front. Entries are {deviceId, sessionId, userId, startTime}.
+    #
+    # A cached entry can outlive a stop handled by another worker, so callers
+    # make their write conditional on the session still being active and
+    # call invalidate() and retry when it isn't (see session_controller).
+
+    def __init__(self, cache_ttl, cache_size):
+        self._cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+
+    def get(self, device_id):
+        entry = self._cache.get(device_id)
+        if entry is None:
+            entry = self._load(device_id)
+            # Misses aren't cached: a session started on another worker must
+            # be visible right away
+            if entry is not None:
+                self._cache.set(device_id, entry)
+        return entry
+
+    def cached(self, device_id):
+        # This worker's cached entry only, never touching the backend (asgi.py
+        # uses it to skip a thread hop when the entry is warm)
+        return self._cache.get(device_id)
+
+    def register(self, device_id, session):
+        entry = {
+            "deviceId": device_id,
+            "sessionId": session._id,
+            "userId": getattr(session, 'userId', None),
+            "startTime": session.startTime
+        }
+        self._store(entry)
+        self._cache.set(device_id, entry)
+        return entry
+
+    def remove(self, device_id, session_id):
+        self._cache.pop(device_id)
+        self._delete(device_id, session_id)
+
+    def invalidate(self, device_id):
+        self._cache.pop(device_id)
+
+    def remove_user(self, user_id):
+        # Account deletion: drop every entry of the user's devices
+        self._cache.remove_where(lambda device_id, entry: str(entry.get('userId')) == str(user_id))
+        self._delete_user(user_id)
+
+    def rebuild(self):
+        # Registers sessions that were active before the registry existed.
+        # Devices that already have an entry keep it, so a repeated run
+        # writes nothing and never overwrites a session started meanwhile.
+        count = 0
+        for doc in TriggerSession.iter_find({"status": "active"}, projection={"deviceId": 1, "userId": 1, "startTime": 1}, lean=True):
+            count += self._store_missing({
+                "deviceId": doc['deviceId'],
+                "sessionId": doc['_id'],
+                "userId": doc.get('userId'),
+                "startTime": doc.get('startTime')
+            })
+        return count
+
+    def stats(self):
+        return self._cache.stats()
+
+    @abstractmethod
+    def _load(self, device_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _store(self, entry):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _store_missing(self, entry):
+        # _store unless the device has an entry; True when it was stored
+        raise NotImplementedError
+
+    @abstractmethod
+    def _delete(self, device_id, session_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _delete_user(self, user_id):
+        raise NotImplementedError
+
+class MongoSessionRegistry(SessionRegistry):
+
+    def _load(self, device_id):
+        doc = ActiveSession.findOne({"deviceId": device_id}, projection={"_id": 0}, lean=True)
+        return doc or None
+
+    def _store(self, entry):
+        ActiveSession.findOneAndUpdate({"deviceId": entry['deviceId']}, {"$set": entry}, upsert=True, projection={"_id": 1}, lean=True)
+
+    def _store_missing(self, entry):
+        existing = ActiveSession.findOneAndUpdate({"deviceId": entry['deviceId']}, {"$setOnInsert": entry}, upsert=True, projection={"_id": 1}, lean=True)
+        return existing is None
+
+    def _delete(self, device_id, session_id):
+        # Only if it still points at this session, a newer one may have replaced it
+        ActiveSession.deleteOne({"deviceId": device_id, "sessionId": session_id})
+
+    def _delete_user(self, user_id):
+        ActiveSession.deleteMany({"userId": user_id})
+
+class MemorySessionRegistry(SessionRegistry):
+    # Process-local registry for tests and single-process development
+
+    def __init__(self, cache_ttl, cache_size):
+        super().__init__(cache_ttl, cache_size)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _load(self, device_id):
+        entry = self._entries.get(device_id)
+        return dict(entry) if entry else None
+
+    def _store(self, entry):
+        with self._lock:
+            self._entries[entry['deviceId']] = dict(entry)
+
+    def _store_missing(self, entry):
+        with self._lock:
+            if entry['deviceId'] in self._entries:
+                return False
+            self._entries[entry['deviceId']] = dict(entry)
+            return True
+
+    def _delete(self, device_id, session_id):
+        with self._lock:
+            entry = self._entries.get(device_id)
+            if entry and entry['sessionId'] == session_id:
+                del self._entries[device_id]
+
+    def _delete_user(self, user_id):
+        with self._lock:
+            for device_id in [d for d, e in self._entries.items() if str(e.get('userId')) == str(user_id)]:
+                del self._entries[device_id]
+
+def create_session_registry(kind):
+    if kind == 'memory':
+        return MemorySessionRegistry(Config.SESSION_REGISTRY_CACHE_SECONDS, Config.SESSION_REGISTRY_CACHE_SIZE)
+    if kind == 'mongo':
+        return MongoSessionRegistry(Config.SESSION_REGISTRY_CACHE_SECONDS, Config.SESSION_REGISTRY_CACHE_SIZE)
+    raise ValueError(f"Unknown SESSION_REGISTRY: {kind}")
+
+session_registry = create_session_registry(Config.SESSION_REGISTRY)
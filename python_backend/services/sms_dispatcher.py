@@ -0,0 +1,210 @@
+import atexit
+import itertools
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from config.env import Config
+from models.TriggerSession import TriggerSession
+from .sms_service import sms_service, SMSNotConfigured
+
+class SMSDispatcher:
+    # Sends emergency SMS off the request path. Each contact is its own job
+    # on a bounded queue drained by a small thread pool, so contacts go out
+    # in parallel and a slow provider never holds up start_trigger.
+    # Per-contact delivery status is written to TriggerSession.smsDeliveries.
+    # Jobs are ordered by trigger start time so that, when the provider rate
+    # limit backs the queue up, the oldest emergencies go out first.
+    #
+    # The in-memory queue is only a work list: each delivery is claimed with
+    # a lease (leaseId/leaseUntil on its smsDeliveries entry) that the sender
+    # renews, so one whose process died is re-sent by recover() in any worker
+    # once the lease runs out, and a stale claim is never sent twice.
+
+    # Statuses of a delivery that still has to go out
+    PENDING = ("queued", "retrying")
+
+    def __init__(self, sender, workers, queue_size, max_retries, retry_backoff, lease_seconds, recovery_interval, max_age):
+        self.sender = sender
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.lease_seconds = lease_seconds
+        self.recovery_interval = recovery_interval
+        self.max_age = max_age
+        self._queue = queue.PriorityQueue(maxsize=queue_size)
+        self._sequence = itertools.count()
+        self._threads = []
+        self._held = set()
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        # Threads don't survive a fork, so start them lazily in each worker
+        if self.workers <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.PriorityQueue(maxsize=self._queue.maxsize)
+            self._held = set()
+            self._threads = []
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'sms-dispatch-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(target=self._recover_loop, name='sms-recovery', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+            self._pid = os.getpid()
+
+    def _lease(self):
+        return {"leaseId": uuid.uuid4().hex, "leaseUntil": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}
+
+    def dispatch_emergency(self, session_id, contacts, device_id, started_at=None):
+        contacts = [c for c in contacts or [] if c.get('phone')]
+        if not contacts:
+            return 0
+
+        message = self.sender.build_emergency_message(device_id)
+        deliveries = [dict({
+            "contactName": c.get('name'),
+            "phone": c.get('phone'),
+            "status": "queued",
+            "attempts": 0,
+            "queuedAt": datetime.utcnow()
+        }, **self._lease()) for c in contacts]
+        TriggerSession.findOneAndUpdate({"_id": session_id}, {"$set": {"smsDeliveries": deliveries}}, projection={"_id": 1}, lean=True)
+
+        if self.workers <= 0:
+            # Inline mode for scripts and tests
+            for index, contact in enumerate(contacts):
+                self._deliver(session_id, index, contact, message)
+            return len(contacts)
+
+        self.start()
+        queued = 0
+        for index, (contact, delivery) in enumerate(zip(contacts, deliveries)):
+            if self._enqueue(started_at, (session_id, index, contact, message, delivery["leaseId"], 0)):
+                queued += 1
+            else:
+                # Left to recover() once the lease runs out
+                print(f"SMS queue full, delaying SMS to {contact.get('name')}")
+        return queued
+
+    def _enqueue(self, started_at, job):
+        try:
+            # The sequence number breaks ties so jobs themselves are never compared
+            priority = (started_at or datetime.utcnow()).timestamp()
+            self._queue.put_nowait((priority, next(self._sequence), job))
+        except queue.Full:
+            return False
+        self._held.add(job[:2])
+        return True
+
+    def _run(self):
+        while True:
+            _, _, job = self._queue.get()
+            try:
+                self._deliver(*job)
+            except Exception as e:
+                print(f"SMS dispatch error: {e}")
+            finally:
+                self._held.discard(job[:2])
+                self._queue.task_done()
+
+    def _recover_loop(self):
+        while True:
+            try:
+                self.recover()
+            except Exception as e:
+                print(f"SMS recovery error: {e}")
+            time.sleep(self.recovery_interval)
+
+    def recover(self):
+        # Re-queues pending deliveries whose lease ran out, i.e. whose process
+        # went away before sending them. Returns how many were queued.
+        now = datetime.utcnow()
+        expired = {"status": {"$in": list(self.PENDING)}, "$or": [{"leaseUntil": {"$lt": now}}, {"leaseUntil": None}]}
+        sessions = TriggerSession.iter_find(
+            {"smsDeliveries": {"$elemMatch": expired}},
+            projection={"deviceId": 1, "startTime": 1, "smsDeliveries": 1},
+            lean=True
+        )
+        queued = 0
+        for session in sessions:
+            for index, delivery in enumerate(session.get('smsDeliveries') or []):
+                lease_until = delivery.get('leaseUntil')
+                if delivery.get('status') not in self.PENDING or (lease_until and lease_until >= now):
+                    continue
+                if (session['_id'], index) in self._held:
+                    continue
+                if (delivery.get('queuedAt') or now) < now - timedelta(seconds=self.max_age):
+                    # Too late to be of use as an alert
+                    self._record(session['_id'], index, delivery.get('leaseId'), status="failed", error="Not sent in time")
+                    continue
+
+                lease = self._lease()
+                if not self._record(session['_id'], index, delivery.get('leaseId'), **lease):
+                    # Claimed by another worker in the meantime
+                    continue
+                contact = {"name": delivery.get('contactName'), "phone": delivery.get('phone')}
+                message = self.sender.build_emergency_message(session.get('deviceId'))
+                job = (session['_id'], index, contact, message, lease["leaseId"], delivery.get('attempts', 0))
+                if self._enqueue(session.get('startTime'), job):
+                    queued += 1
+        return queued
+
+    def _deliver(self, session_id, index, contact, message, lease_id=None, attempts=0):
+        while True:
+            # Renew the claim; lost means another worker took the delivery over
+            if lease_id and not self._record(session_id, index, lease_id, leaseUntil=datetime.utcnow() + timedelta(seconds=self.lease_seconds)):
+                return False
+            attempts += 1
+            try:
+                sid = self.sender.send_sms(contact['phone'], message)
+                self._record(session_id, index, lease_id, status="sent", attempts=attempts, sid=sid, sentAt=datetime.utcnow(), error=None)
+                return True
+            except SMSNotConfigured as e:
+                # Retrying won't help
+                self._record(session_id, index, lease_id, status="failed", attempts=attempts, error=str(e))
+                return False
+            except Exception as e:
+                print(f"Failed SMS to {contact.get('name')} (attempt {attempts}): {e}")
+                if attempts > self.max_retries:
+                    self._record(session_id, index, lease_id, status="failed", attempts=attempts, error=str(e))
+                    return False
+                self._record(session_id, index, lease_id, status="retrying", attempts=attempts, error=str(e))
+                time.sleep(self.retry_backoff * (2 ** (attempts - 1)))
+
+    def _record(self, session_id, index, lease_id=None, **fields):
+        # Updates one delivery, only while lease_id still holds it. Returns
+        # False when the lease was lost.
+        query = {"_id": session_id}
+        if lease_id:
+            query[f"smsDeliveries.{index}.leaseId"] = lease_id
+        update = {f"smsDeliveries.{index}.{key}": value for key, value in fields.items()}
+        return TriggerSession.findOneAndUpdate(query, {"$set": update}, projection={"_id": 1}, lean=True) is not None
+
+    def pending(self):
+        return self._queue.unfinished_tasks
+
+    def shutdown(self, timeout=10):
+        # Give queued alerts a chance to go out on graceful shutdown
+        deadline = time.monotonic() + timeout
+        while self._pid == os.getpid() and self.pending() and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+sms_dispatcher = SMSDispatcher(
+    sms_service,
+    workers=Config.SMS_WORKERS,
+    queue_size=Config.SMS_QUEUE_SIZE,
+    max_retries=Config.SMS_MAX_RETRIES,
+    retry_backoff=Config.SMS_RETRY_BACKOFF_SECONDS,
+    lease_seconds=Config.SMS_LEASE_SECONDS,
+    recovery_interval=Config.SMS_RECOVERY_INTERVAL_SECONDS,
+    max_age=Config.SMS_MAX_AGE_SECONDS
+)
+atexit.register(sms_dispatcher.shutdown)
@@ -1,14 +1,66 @@
 import json
-from twilio.rest import Client
+import threading
 from config.env import Config
+from utils.rate_limit import KeyedTokenBuckets, SharedTokenBuckets
+
+class SMSNotConfigured(Exception):
+    pass
+
+class SMSRateLimited(Exception):
+    pass
+
+def pooled_session(session, pool_size):
+    # Keep-alive connections shared by every sender thread
+    from requests.adapters import HTTPAdapter
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def create_rate_limits(kind):
+    # Per sender number. 'mongo' holds the rate across all workers, 'memory'
+    # only within this process (scripts, single worker).
+    if kind == 'memory':
+        return KeyedTokenBuckets(Config.SMS_RATE_PER_SECOND, Config.SMS_RATE_BURST)
+    if kind == 'mongo':
+        from models.RateLimit import RateLimit
+        return SharedTokenBuckets(RateLimit.reserve, Config.SMS_RATE_PER_SECOND, Config.SMS_RATE_BURST)
+    raise ValueError(f"Unknown SMS_RATE_LIMIT_STORE: {kind}")
 
 class SMSService:
     def __init__(self):
-        self.client = None
-        self.from_number = None
-        if Config.TWILIO_ACCOUNT_SID and Config.TWILIO_AUTH_TOKEN:
-            self.client = Client(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN)
-            self.from_number = self.clean_number(Config.TWILIO_PHONE_NUMBER)
+        # The Twilio client and HTTP session are built on first send, so
+        # processes that never send an SMS don't load the SDKs
+        self._client = None
+        self._session = None
+        self._init_lock = threading.Lock()
+        self.configured = bool(Config.TWILIO_ACCOUNT_SID and Config.TWILIO_AUTH_TOKEN)
+        self.from_number = self.clean_number(Config.TWILIO_PHONE_NUMBER) if self.configured else None
+        self.rate_limits = create_rate_limits(Config.SMS_RATE_LIMIT_STORE)
+        # In-flight sends are limited per process: SMS_MAX_CONCURRENCY is
+        # shared out between the WEB_CONCURRENCY workers
+        self.concurrency = threading.BoundedSemaphore(max(Config.SMS_MAX_CONCURRENCY // max(Config.WEB_CONCURRENCY, 1), 1))
+
+    @property
+    def client(self):
+        if self._client is None and self.configured:
+            with self._init_lock:
+                if self._client is None:
+                    from twilio.rest import Client
+                    from twilio.http.http_client import TwilioHttpClient
+                    http_client = TwilioHttpClient(pool_connections=True, timeout=Config.SMS_TIMEOUT_SECONDS)
+                    pooled_session(http_client.session, Config.SMS_HTTP_POOL_SIZE)
+                    self._client = Client(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN, http_client=http_client)
+        return self._client
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._init_lock:
+                if self._session is None:
+                    import requests
+                    self._session = pooled_session(requests.Session(), Config.SMS_HTTP_POOL_SIZE)
+        return self._session
 
     def clean_number(self, num):
         if not num: return None
@@ -22,37 +74,64 @@ class SMSService:
         # Implement logic similar to Node.js version
         return phone # Placeholder for complex logic
 
+    def build_emergency_message(self, device_id):
+        return f"""🚨 EMERGENCY ALERT from MITR Device {device_id}
+Help needed! Click to see location: https://mitr-beta.vercel.app
+This is an automated alert from MITR SOS system."""
+
+    def send_sms(self, to, body):
+        # Sends one message and returns the provider id, raises on failure.
+        # Waits for the sender number's rate limit and a free concurrency slot first.
+        if not Config.SMS_GATEWAY_URL and not self.configured:
+            raise SMSNotConfigured("Twilio client not initialized")
+        if not self.rate_limits.acquire(f'sms:{self.from_number}', timeout=Config.SMS_RATE_WAIT_SECONDS):
+            raise SMSRateLimited(f"Rate limit wait exceeded for sender {self.from_number}")
+        with self.concurrency:
+            return self._send(to, body)
+
+    def _send(self, to, body):
+        # SMS_GATEWAY_URL swaps Twilio for a plain HTTP endpoint (local fakes, tests).
+        to_number = self.format_phone_number(to)
+        if Config.SMS_GATEWAY_URL:
+            resp = self.session.post(
+                Config.SMS_GATEWAY_URL,
+                json={"to": to_number, "from": self.from_number, "body": body},
+                timeout=Config.SMS_TIMEOUT_SECONDS
+            )
+            resp.raise_for_status()
+            data = resp.json() if resp.content else {}
+            return data.get('sid') or data.get('id')
+
+        if not self.client:
+            raise SMSNotConfigured("Twilio client not initialized")
+
+        message = self.client.messages.create(
+            body=body,
+            from_=self.from_number,
+            to=to_number
+        )
+        return message.sid
+
     def send_emergency_sms(self, contacts, device_id):
-        # We need async here if we want to match node logic, but python requests are sync unless using aiohttp.
-        # Twilio python client is blocking by default.
-        # We can simulate async or just run blocking for now as Flask handlers are usually threaded.
-        
+        # Blocking fan-out, one contact after the other. The trigger path uses
+        # services.sms_dispatcher instead; this stays for scripts and tools.
         if not contacts:
             print('No contacts configured')
             return []
 
-        message_text = f"""🚨 EMERGENCY ALERT from MITR Device {device_id}
-Help needed! Click to see location: https://mitr-beta.vercel.app
-This is an automated alert from MITR SOS system."""
+        message_text = self.build_emergency_message(device_id)
 
         results = []
         for contact in contacts:
             try:
-                to_number = self.format_phone_number(contact['phone'])
-                if not self.client:
-                    print("Twilio client not initialized")
-                    continue
-                    
-                message = self.client.messages.create(
-                    body=message_text,
-                    from_=self.from_number,
-                    to=to_number
-                )
+                sid = self.send_sms(contact['phone'], message_text)
                 results.append({
                     "contactName": contact['name'],
                     "status": "sent",
-                    "sid": message.sid
+                    "sid": sid
                 })
+            except SMSNotConfigured as e:
+                print(e)
             except Exception as e:
                 print(f"Failed SMS to {contact['name']}: {e}")
                 results.append({
@@ -1,15 +1,13 @@
 import jwt
+import hashlib
 import datetime
 from config.env import Config
 
-def generate_auth_token(user_id):
-    # Parsing '7d' to seconds/datetime manually or assuming config has sane values.
-    # JWT library handles 'exp' as epoch usually.
-    # For now simplicity: default 7 days if string parsing fails or complex logic needs extracting.
-    
+def get_token_lifetime():
+    # JWT_EXPIRES_IN uses the Node style suffixes: 7d, 12h, 30m
     expires_in = Config.JWT_EXPIRES_IN
-    delta = timedelta(days=7) # Default
-    
+    delta = datetime.timedelta(days=7) # Default
+
     if isinstance(expires_in, str):
         if expires_in.endswith('d'):
             delta = datetime.timedelta(days=int(expires_in[:-1]))
@@ -17,16 +15,41 @@ def generate_auth_token(user_id):
             delta = datetime.timedelta(hours=int(expires_in[:-1]))
         elif expires_in.endswith('m'):
             delta = datetime.timedelta(minutes=int(expires_in[:-1]))
-            
+
+    return delta
+
+def generate_auth_token(user_id):
     payload = {
         'id': str(user_id),
-        'exp': datetime.datetime.utcnow() + delta
+        'exp': datetime.datetime.utcnow() + get_token_lifetime()
     }
     
     return jwt.encode(payload, Config.JWT_SECRET, algorithm='HS256')
 
+def generate_stream_token(user_id, session_id):
+    # Short-lived token for one session's live-location stream. EventSource
+    # can't set headers, so it is passed as ?token= and ends up in access
+    # logs; it is good for nothing else and expires after SSE_TOKEN_SECONDS.
+    payload = {
+        'id': str(user_id),
+        'sessionId': str(session_id),
+        'scope': 'stream',
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(seconds=Config.SSE_TOKEN_SECONDS)
+    }
+
+    return jwt.encode(payload, Config.JWT_SECRET, algorithm='HS256')
+
+def verify_stream_token(token, session_id):
+    decoded = verify_token(token)
+    if not decoded or decoded.get('scope') != 'stream' or decoded.get('sessionId') != str(session_id):
+        return None
+    return decoded
+
 def verify_token(token):
     try:
         return jwt.decode(token, Config.JWT_SECRET, algorithms=['HS256'])
     except Exception:
         return None
+
+def hash_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
@@ -0,0 +1,125 @@
+from abc import ABC, abstractmethod
+import threading
+from datetime import datetime
+from pymongo.errors import DuplicateKeyError
+from config.env import Config
+from models.AuthToken import AuthToken
+from .token_service import hash_token, get_token_lifetime
+
+class TokenStore(ABC):
+    # Where issued login tokens live. Only hashes are kept, the raw JWT
+    # is never stored. Pick the backend with TOKEN_STORE.
+    #
+    # Each token carries a version that touch_user() bumps whenever the
+    # user's principal changes (profile, devices, password). The auth
+    # middleware reads it at least every AUTH_RECHECK_SECONDS per token, so
+    # revocations and changes made on one worker reach the others within
+    # that time (see AuthCache).
+
+    @abstractmethod
+    def add(self, token, user_id, expires_at=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def version(self, token, user_id):
+        # The token's version, or None when it is revoked, expired or not the user's
+        raise NotImplementedError
+
+    def is_active(self, token, user_id):
+        return self.version(token, user_id) is not None
+
+    @abstractmethod
+    def touch_user(self, user_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def revoke(self, token):
+        raise NotImplementedError
+
+    @abstractmethod
+    def revoke_all(self, user_id, keep=None):
+        # keep: a token that stays valid (the one changing the password)
+        raise NotImplementedError
+
+    def _expiry(self, expires_at):
+        return expires_at or datetime.utcnow() + get_token_lifetime()
+
+class MongoTokenStore(TokenStore):
+
+    def add(self, token, user_id, expires_at=None):
+        try:
+            AuthToken(
+                tokenHash=hash_token(token),
+                userId=user_id,
+                expiresAt=self._expiry(expires_at)
+            ).save()
+        except DuplicateKeyError:
+            # Same token migrated twice
+            pass
+
+    def version(self, token, user_id):
+        # The TTL monitor runs about once a minute, so check expiry here too
+        doc = AuthToken.findOne({
+            "tokenHash": hash_token(token),
+            "userId": user_id,
+            "expiresAt": {"$gt": datetime.utcnow()}
+        }, projection={"principalVersion": 1}, lean=True)
+        return None if doc is None else doc.get('principalVersion', 0)
+
+    def touch_user(self, user_id):
+        AuthToken.get_collection().update_many({"userId": user_id}, {"$inc": {"principalVersion": 1}})
+
+    def revoke(self, token):
+        AuthToken.deleteOne({"tokenHash": hash_token(token)})
+
+    def revoke_all(self, user_id, keep=None):
+        query = {"userId": user_id}
+        if keep:
+            query["tokenHash"] = {"$ne": hash_token(keep)}
+        return AuthToken.deleteMany(query).deleted_count
+
+class MemoryTokenStore(TokenStore):
+    # Process-local store for tests and single-process development
+
+    def __init__(self):
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def add(self, token, user_id, expires_at=None):
+        with self._lock:
+            self._tokens[hash_token(token)] = [str(user_id), self._expiry(expires_at), 0]
+
+    def version(self, token, user_id):
+        entry = self._tokens.get(hash_token(token))
+        if not entry or entry[0] != str(user_id) or entry[1] <= datetime.utcnow():
+            return None
+        return entry[2]
+
+    def touch_user(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            for entry in self._tokens.values():
+                if entry[0] == user_id:
+                    entry[2] += 1
+
+    def revoke(self, token):
+        with self._lock:
+            self._tokens.pop(hash_token(token), None)
+
+    def revoke_all(self, user_id, keep=None):
+        user_id = str(user_id)
+        kept = hash_token(keep) if keep else None
+        with self._lock:
+            hashes = [h for h, entry in self._tokens.items() if entry[0] == user_id and h != kept]
+            for h in hashes:
+                del self._tokens[h]
+        return len(hashes)
+
+def create_token_store(kind):
+    if kind == 'memory':
+        return MemoryTokenStore()
+    if kind == 'mongo':
+        return MongoTokenStore()
+    raise ValueError(f"Unknown TOKEN_STORE: {kind}")
+
+token_store = create_token_store(Config.TOKEN_STORE)
@@ -0,0 +1,45 @@
+import sys
+import time
+
+# Principal caching in services.auth_cache: no database needed.
+
+def test_auth_cache():
+    from services.auth_cache import AuthCache
+
+    cache = AuthCache(maxsize=10, ttl=0.3, recheck=0.1)
+    principal = {"_id": "u1", "name": "Asha", "devices": ["d1"]}
+
+    print("Caching a principal...")
+    cache.put("t1", principal, version=0)
+    assert cache.get("t1", 0) == principal
+    assert cache.get("t1", 1) is None
+    cached = cache.current("t1")
+    cached["devices"].append("d2")
+    assert cache.current("t1")["devices"] == ["d1"]
+    print("✓ returned by matching version only, as a copy")
+
+    time.sleep(0.15)
+    assert cache.current("t1") is None
+    assert cache.get("t1", 0) is not None and cache.current("t1") is not None
+    print("✓ needs a version check after recheck seconds, a match renews it")
+
+    time.sleep(0.35)
+    assert cache.get("t1", 0) is None
+    print("✓ expires after the TTL")
+
+    cache.put("t2", principal, version=0, expires_at=time.time() + 0.05)
+    time.sleep(0.1)
+    assert cache.get("t2", 0) is None
+    cache.put("t3", principal, version=0, expires_at=time.time() - 1)
+    assert cache.get("t3", 0) is None
+    disabled = AuthCache(maxsize=10, ttl=0, recheck=0)
+    disabled.put("t4", principal, version=0)
+    assert disabled.get("t4", 0) is None
+    print("✓ never outlives the JWT, TTL 0 disables it")
+
+if __name__ == "__main__":
+    try:
+        test_auth_cache()
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,63 @@
+import sys
+from datetime import datetime, timedelta
+
+# Write-behind ingestion in services.coordinate_buffer. Needs MongoDB
+# (MONGODB_URI) and is skipped when it isn't reachable.
+
+def test_coordinate_buffer():
+    from config.db import connect_db
+    from models.TriggerSession import TriggerSession
+    from models.SessionCoordinate import SessionCoordinate
+    from services.coordinate_buffer import CoordinateBuffer
+
+    if not connect_db():
+        print("MongoDB not reachable, coordinate buffer test skipped")
+        return
+
+    buffer = CoordinateBuffer(flush_interval=3600, flush_size=1000, max_buffered=8)
+    session = TriggerSession(deviceId='test-buffer', userId=None)
+    session.save()
+    entry = {"deviceId": 'test-buffer', "sessionId": session._id, "userId": None, "startTime": session.startTime}
+    start = datetime.utcnow().replace(microsecond=0)
+
+    def fixes(first, count):
+        return [{"latitude": 12.97 + i * 1e-4, "longitude": 77.59, "accuracy": None, "speed": None,
+                 "timestamp": start + timedelta(seconds=i)} for i in range(first, first + count)]
+
+    def stored():
+        return SessionCoordinate.get_collection().count_documents({"meta.sessionId": session._id})
+
+    try:
+        print("Buffering fixes...")
+        buffer.add('test-buffer', entry, fixes(0, 5))
+        assert buffer.pending('test-buffer') == 5 and stored() == 0
+        assert buffer.flush('test-buffer') == 5
+        assert buffer.pending() == 0 and stored() == 5
+        assert TriggerSession.findOne({"_id": session._id}).coordinatesCount == 5
+        print("✓ flush writes the fixes and the summary")
+
+        buffer.add('test-buffer', entry, fixes(5, 6))
+        buffer.add('test-buffer', entry, fixes(11, 3))
+        assert buffer.pending() == 0 and stored() == 14
+        print("✓ flushed inline once max_buffered is reached")
+
+        buffer.add('test-buffer', entry, fixes(3, 4))
+        assert buffer.flush() == 4 and stored() == 14
+        print("✓ fixes already stored are not written twice")
+
+        TriggerSession.findOneAndUpdate({"_id": session._id}, {"$set": {"status": "completed"}})
+        buffer.add('test-buffer', entry, fixes(20, 2))
+        assert buffer.flush() == 2 and stored() == 16
+        metrics = buffer.metrics()
+        assert metrics["failures"] == 0 and metrics["dropped"] == 0, metrics
+        print("✓ fixes buffered before a stop land in the stopped session")
+    finally:
+        SessionCoordinate.get_collection().delete_many({"meta.sessionId": session._id})
+        TriggerSession.deleteOne({"_id": session._id})
+
+if __name__ == "__main__":
+    try:
+        test_coordinate_buffer()
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
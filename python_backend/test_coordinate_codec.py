@@ -0,0 +1,63 @@
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# Archive round trips through utils.coordinate_codec: no database needed.
+
+def test_pack_round_trip():
+    from utils import coordinate_codec
+
+    start = datetime(2026, 1, 1, 12, 0, 0, 123000)
+    fixes = [
+        {"latitude": 12.9715987 + i * 1e-4, "longitude": -77.5945627 - i * 1e-4,
+         "accuracy": 4.25 if i % 2 else None, "speed": None if i % 2 else 1.5,
+         "timestamp": start + timedelta(milliseconds=1500 * i),
+         "receivedAt": start + timedelta(seconds=30 + i)}
+        for i in range(50)
+    ]
+
+    print("Packing and unpacking 50 fixes...")
+    unpacked = coordinate_codec.unpack(coordinate_codec.pack(fixes))
+    assert len(unpacked) == len(fixes)
+    for fix, back in zip(fixes, unpacked):
+        assert back['timestamp'] == fix['timestamp'] and back['receivedAt'] == fix['receivedAt'], back
+        assert abs(back['latitude'] - fix['latitude']) <= 5e-7 and abs(back['longitude'] - fix['longitude']) <= 5e-7, back
+        assert back['accuracy'] == fix['accuracy'] and back['speed'] == fix['speed'], back
+        assert coordinate_codec.fix_key(back) == coordinate_codec.fix_key(fix)
+    print("✓ times exact, positions within half a microdegree, missing values kept")
+
+    assert coordinate_codec.unpack(coordinate_codec.pack([])) == []
+    legacy = coordinate_codec.pack(fixes[:2])
+    del legacy['r0'], legacy['r']
+    assert 'receivedAt' not in coordinate_codec.unpack(legacy)[0]
+    print("✓ empty archive and archive without receive times")
+
+def test_archive_leftovers():
+    from utils import coordinate_codec
+    from models.SessionCoordinate import SessionCoordinate
+
+    received = datetime(2026, 1, 1, 12, 0, 5)
+    fixes = [
+        {"latitude": 12.9715987, "longitude": 77.5945627, "accuracy": 5.0, "speed": None,
+         "timestamp": datetime(2026, 1, 1, 12, 0, i), "receivedAt": received}
+        for i in range(3)
+    ]
+    session = SimpleNamespace(_id='s1', coordinatesArchive=coordinate_codec.pack(fixes), coordinates=None)
+
+    print("Merging an archive with leftover documents it already holds...")
+    # Packed fixes come back at microdegree precision, the documents don't
+    leftover = dict(fixes[1], _id='c1')
+    late = dict(fixes[2], _id='c2', timestamp=datetime(2026, 1, 1, 12, 0, 9))
+    merged = SessionCoordinate._combine(session, [leftover, late])
+    assert [c['timestamp'].second for c in merged] == [0, 1, 2, 9], merged
+    assert merged[1]['latitude'] == 12.971599, merged[1]
+    print("✓ leftover with more than 6 decimals matched its packed copy")
+    print("✓ fix received after archiving kept")
+
+if __name__ == "__main__":
+    try:
+        test_pack_round_trip()
+        test_archive_leftovers()
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,62 @@
+import sys
+from datetime import datetime, timedelta
+
+# Keyset cursors in utils.pagination: no database needed.
+
+def _matches(doc, query):
+    # Just enough of MongoDB's matcher for keyset_filter() output
+    if "$or" in query:
+        return any(_matches(doc, q) for q in query["$or"])
+    for field, condition in query.items():
+        if isinstance(condition, dict):
+            (op, value), = condition.items()
+            if not (doc[field] > value if op == "$gt" else doc[field] < value):
+                return False
+        elif doc[field] != condition:
+            return False
+    return True
+
+def test_pagination():
+    from bson import ObjectId
+    from utils.pagination import encode_cursor, decode_cursor, keyset_filter
+
+    start = datetime(2026, 1, 1, 12, 0, 0, 250000)
+    _id = ObjectId()
+    print("Round-tripping cursors...")
+    assert decode_cursor(encode_cursor(start, _id)) == (start, _id)
+    assert decode_cursor(encode_cursor(start, None)) == (start, None)
+    assert '=' not in encode_cursor(start, _id)
+    for bad in ('', 'not-a-cursor', encode_cursor(start, _id)[:-4]):
+        try:
+            decode_cursor(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f'accepted {bad!r}')
+    print("✓ datetime and _id survive, bad cursors raise ValueError")
+
+    # Sessions sharing start times, paged newest first like history
+    docs = [{"startTime": start + timedelta(minutes=i // 3), "_id": ObjectId()} for i in range(10)]
+    ordered = sorted(docs, key=lambda d: (d["startTime"], d["_id"]), reverse=True)
+    pages, cursor = [], None
+    while True:
+        query = keyset_filter("startTime", *decode_cursor(cursor)) if cursor else {}
+        page = [d for d in ordered if _matches(d, query)][:4]
+        if not page:
+            break
+        pages.append(page)
+        cursor = encode_cursor(page[-1]["startTime"], page[-1]["_id"])
+    assert [d for page in pages for d in page] == ordered, pages
+    print("✓ descending pages cover every document once, ties broken by _id")
+
+    ascending = sorted(docs, key=lambda d: (d["startTime"], d["_id"]))
+    after = keyset_filter("startTime", ascending[4]["startTime"], ascending[4]["_id"], ascending=True)
+    assert [d for d in ascending if _matches(d, after)] == ascending[5:]
+    assert keyset_filter("timestamp", start, None, ascending=True) == {"timestamp": {"$gt": start}}
+    print("✓ ascending filter and filter without _id")
+
+if __name__ == "__main__":
+    try:
+        test_pagination()
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
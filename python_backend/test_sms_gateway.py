@@ -0,0 +1,135 @@
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# Sends through SMS_GATEWAY_URL against a fake gateway on localhost: no
+# Twilio account needed. The dispatcher test also needs MongoDB (MONGODB_URI,
+# use a scratch database: recover() picks up any stalled delivery) and is
+# skipped when it isn't reachable.
+
+class FakeGateway(BaseHTTPRequestHandler):
+    # 'fail' always gets a 500, 'flaky' only on its first attempt
+    received = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        FakeGateway.received.append(body)
+        flaky = body['to'] == 'flaky' and [r['to'] for r in FakeGateway.received].count('flaky') == 1
+        if body['to'] == 'fail' or flaky:
+            self.send_response(500)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps({"sid": f"SM{len(FakeGateway.received)}"}).encode())
+
+    def log_message(self, *args):
+        pass
+
+def test_sms_gateway():
+    from config.env import Config
+    from services.sms_service import sms_service, create_rate_limits
+
+    server = HTTPServer(('127.0.0.1', 0), FakeGateway)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    previous = Config.SMS_GATEWAY_URL, sms_service.rate_limits
+    Config.SMS_GATEWAY_URL = f'http://127.0.0.1:{server.server_port}/sms'
+    sms_service.rate_limits = create_rate_limits('memory')
+    try:
+        print("Sending through the fake SMS gateway...")
+        sid = sms_service.send_sms('+15550100', 'hello')
+        assert sid == 'SM1', sid
+        assert FakeGateway.received[-1] == {"to": "+15550100", "from": sms_service.from_number, "body": "hello"}
+        print("✓ message delivered, provider id returned")
+
+        try:
+            sms_service.send_sms('fail', 'hello')
+        except Exception as e:
+            print(f"✓ gateway error raised: {e}")
+        else:
+            raise AssertionError('gateway error was not raised')
+    finally:
+        Config.SMS_GATEWAY_URL, sms_service.rate_limits = previous
+        server.shutdown()
+
+def test_emergency_fanout():
+    import time
+    from datetime import datetime, timedelta
+    from config.env import Config
+    from config.db import connect_db
+    from models.TriggerSession import TriggerSession
+    from services.sms_service import sms_service, create_rate_limits
+    from services.sms_dispatcher import SMSDispatcher
+
+    if not connect_db():
+        print("MongoDB not reachable, dispatcher test skipped")
+        return
+
+    server = HTTPServer(('127.0.0.1', 0), FakeGateway)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    previous = Config.SMS_GATEWAY_URL, sms_service.rate_limits
+    Config.SMS_GATEWAY_URL = f'http://127.0.0.1:{server.server_port}/sms'
+    sms_service.rate_limits = create_rate_limits('memory')
+    dispatcher = SMSDispatcher(sms_service, workers=2, queue_size=10, max_retries=2, retry_backoff=0.05,
+                               lease_seconds=30, recovery_interval=3600, max_age=3600)
+    sessions = []
+
+    def deliveries(session):
+        return TriggerSession.findOne({"_id": session._id}, projection={"smsDeliveries": 1}, lean=True)['smsDeliveries']
+
+    def wait():
+        deadline = time.monotonic() + 10
+        while dispatcher.pending() and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    try:
+        # Left behind by a worker that died: one lease ran out, one is still held
+        now = datetime.utcnow()
+        stalled = TriggerSession(deviceId='test-sms-stalled', status='completed')
+        stalled.smsDeliveries = [
+            {"contactName": "dead", "phone": "+15550101", "status": "queued", "attempts": 0,
+             "queuedAt": now, "leaseId": "dead", "leaseUntil": now - timedelta(seconds=1)},
+            {"contactName": "live", "phone": "+15550102", "status": "queued", "attempts": 0,
+             "queuedAt": now, "leaseId": "live", "leaseUntil": now + timedelta(seconds=60)}
+        ]
+        stalled.save()
+        sessions.append(stalled)
+
+        print("Recovering deliveries of a dead worker...")
+        dispatcher.start()
+        time.sleep(0.5)
+        wait()
+        dead, live = deliveries(stalled)
+        assert dead['status'] == 'sent' and dead['leaseId'] != 'dead', dead
+        assert live['status'] == 'queued' and live['leaseId'] == 'live', live
+        print("✓ expired lease re-sent, held lease left alone")
+
+        print("Fanning out an emergency...")
+        session = TriggerSession(deviceId='test-sms-fanout', status='active')
+        session.save()
+        sessions.append(session)
+        contacts = [{"name": "ok", "phone": "+15550103"}, {"name": "flaky", "phone": "flaky"}, {"name": "bad", "phone": "fail"}]
+        assert dispatcher.dispatch_emergency(session._id, contacts, 'test-sms-fanout') == 3
+        time.sleep(0.2)
+        wait()
+        ok, flaky, bad = deliveries(session)
+        assert ok['status'] == 'sent' and ok['attempts'] == 1 and ok['sid'], ok
+        assert flaky['status'] == 'sent' and flaky['attempts'] == 2 and flaky['error'] is None, flaky
+        assert bad['status'] == 'failed' and bad['attempts'] == 3 and '500' in bad['error'], bad
+        print("✓ contacts sent, flaky one after a retry")
+        print("✓ failing contact recorded as failed after 2 retries")
+    finally:
+        for session in sessions:
+            TriggerSession.deleteOne({"_id": session._id})
+        Config.SMS_GATEWAY_URL, sms_service.rate_limits = previous
+        server.shutdown()
+
+if __name__ == "__main__":
+    try:
+        test_sms_gateway()
+        test_emergency_fanout()
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,40 @@
+import sys
+import math
+
+# Douglas-Peucker simplification in utils.trajectory: no database needed.
+
+def _track(count):
+    # A zigzag heading east, about 110 m between fixes
+    return [{"latitude": 0.001 * (i % 2), "longitude": 0.001 * i} for i in range(count)]
+
+def test_simplify():
+    from utils.trajectory import simplify, importance
+
+    track = _track(101)
+    print("Simplifying a 101-fix zigzag...")
+    assert simplify(track) == track
+    assert simplify(track[:2], max_points=1) == track[:2]
+
+    for max_points in (2, 10, 50):
+        kept = simplify(track, max_points=max_points)
+        assert len(kept) == max_points, (max_points, len(kept))
+        assert kept[0] is track[0] and kept[-1] is track[-1]
+        assert [track.index(c) for c in kept] == sorted(track.index(c) for c in kept)
+    print("✓ max_points honoured, endpoints kept, order preserved")
+
+    straight = [{"latitude": 0.0, "longitude": 0.0001 * i} for i in range(20)]
+    assert simplify(straight, tolerance=1) == [straight[0], straight[-1]]
+    assert len(simplify(track, tolerance=1)) == len(track)
+    print("✓ tolerance drops collinear fixes, keeps the zigzag")
+
+    ranks = importance(track)
+    assert math.isinf(ranks[0]) and math.isinf(ranks[-1])
+    assert len(simplify(track, tolerance=1, max_points=5)) == 5
+    print("✓ tolerance and max_points combine")
+
+if __name__ == "__main__":
+    try:
+        test_simplify()
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
@@ -1,4 +1,4 @@
-from flask import jsonify
+from flask import jsonify, current_app, Response, stream_with_context
 
 class ApiResponse:
     def __init__(self, status_code, data, message="Success"):
@@ -15,6 +15,46 @@ class ApiResponse:
         }
         return jsonify(response_body), self.status_code
 
+def stream_array_response(key, items, status_code=200, message="Success", extra=None):
+    # Same envelope as ApiResponse, but data[key] is written item by item
+    # from an iterator (e.g. Model.iter_find) instead of built in memory.
+    def generate():
+        dumps = current_app.json.dumps
+        head = {"success": status_code < 400, "message": message}
+        yield dumps(head)[:-1] + ', "data": {'
+        if extra:
+            yield dumps(extra)[1:-1] + ', '
+        yield dumps(key) + ': ['
+        first = True
+        for item in items:
+            yield ('' if first else ',') + dumps(item)
+            first = False
+        yield ']}}'
+
+    return Response(stream_with_context(generate()), status=status_code, mimetype='application/json')
+
+def sse_event(event=None, data=None, event_id=None, retry=None, comment=None):
+    # One text/event-stream frame
+    lines = []
+    if comment is not None:
+        lines.append(f": {comment}")
+    if retry is not None:
+        lines.append(f"retry: {int(retry)}")
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    if data is not None:
+        lines.append(f"data: {current_app.json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+def sse_response(events):
+    # Streams the frames yielded by `events`; proxies must not buffer them
+    return Response(stream_with_context(events), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
 # Helper function to match the usage `new ApiResponse(res, 200, ...)` if possible, 
 # but in Flask we return the response object.
 # The controller will likely use it as: 
@@ -0,0 +1,164 @@
+from datetime import datetime, timedelta
+import numpy as np
+from bson.binary import Binary
+
+# Compact coordinate encodings. Fixes become columns: timestamps as
+# millisecond deltas, latitude/longitude as microdegree (1e-6, ~11 cm)
+# integer deltas, accuracy and speed as float32 (NaN for missing).
+#
+#   wire:  columnar() / from_columnar()     JSON arrays of small integers
+#          polyline() / from_polyline()     Google encoded polyline + time deltas
+#   rest:  pack() / unpack()                     same columns as little-endian
+#                                           binary in one BSON document
+
+SCALE = 1_000_000
+EPOCH = datetime(1970, 1, 1)
+
+def _millis(value):
+    return int(round((value - EPOCH).total_seconds() * 1000))
+
+def _from_millis(value):
+    return EPOCH + timedelta(milliseconds=int(value))
+
+def fix_key(c):
+    # What survives pack(): millisecond timestamp, microdegree position
+    return (_millis(c['timestamp']), int(round(c['latitude'] * SCALE)), int(round(c['longitude'] * SCALE)))
+
+def _optional(values):
+    return np.array([np.nan if v is None else v for v in values], dtype='<f4')
+
+def _columns(coordinates):
+    times = np.array([_millis(c['timestamp']) for c in coordinates], dtype=np.int64)
+    lat = np.round(np.array([c['latitude'] for c in coordinates], dtype=float) * SCALE).astype(np.int64)
+    lng = np.round(np.array([c['longitude'] for c in coordinates], dtype=float) * SCALE).astype(np.int64)
+    return {
+        "t": np.diff(times, prepend=0),
+        "lat": np.diff(lat, prepend=0),
+        "lng": np.diff(lng, prepend=0),
+        "accuracy": _optional([c.get('accuracy') for c in coordinates]),
+        "speed": _optional([c.get('speed') for c in coordinates])
+    }
+
+def _rows(count, t, lat, lng, accuracy, speed, received=None):
+    times = np.cumsum(np.asarray(t, dtype=np.int64))
+    lats = np.cumsum(np.asarray(lat, dtype=np.int64)) / SCALE
+    lngs = np.cumsum(np.asarray(lng, dtype=np.int64)) / SCALE
+    accuracy = np.asarray(accuracy, dtype=float)
+    speed = np.asarray(speed, dtype=float)
+    return [{
+        "latitude": float(lats[i]),
+        "longitude": float(lngs[i]),
+        "accuracy": None if np.isnan(accuracy[i]) else round(float(accuracy[i]), 2),
+        "speed": None if np.isnan(speed[i]) else round(float(speed[i]), 2),
+        "timestamp": _from_millis(times[i]),
+        **({"receivedAt": _from_millis(received[i])} if received is not None else {})
+    } for i in range(count)]
+
+def _nullable(values):
+    return [None if np.isnan(v) else round(float(v), 2) for v in values]
+
+def columnar(coordinates):
+    # First entry of each delta column is the absolute value
+    columns = _columns(coordinates)
+    return {
+        "encoding": "columnar-e6",
+        "count": len(coordinates),
+        "t": columns["t"].tolist(),
+        "lat": columns["lat"].tolist(),
+        "lng": columns["lng"].tolist(),
+        "accuracy": _nullable(columns["accuracy"]),
+        "speed": _nullable(columns["speed"])
+    }
+
+def from_columnar(data):
+    accuracy = [np.nan if v is None else v for v in data["accuracy"]]
+    speed = [np.nan if v is None else v for v in data["speed"]]
+    return _rows(data["count"], data["t"], data["lat"], data["lng"], accuracy, speed)
+
+def _encode_value(value):
+    value = ~(value << 1) if value < 0 else value << 1
+    chunks = []
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+    return ''.join(chunks)
+
+def polyline(coordinates, precision=5):
+    # Google encoded polyline of the track (what map SDKs decode natively),
+    # plus the timestamp deltas and optional fields as columns
+    factor = 10 ** precision
+    encoded = []
+    last_lat = last_lng = 0
+    for c in coordinates:
+        lat = int(round(c['latitude'] * factor))
+        lng = int(round(c['longitude'] * factor))
+        encoded.append(_encode_value(lat - last_lat))
+        encoded.append(_encode_value(lng - last_lng))
+        last_lat, last_lng = lat, lng
+    columns = _columns(coordinates)
+    return {
+        "encoding": "polyline",
+        "precision": precision,
+        "count": len(coordinates),
+        "polyline": ''.join(encoded),
+        "t": columns["t"].tolist(),
+        "accuracy": _nullable(columns["accuracy"]),
+        "speed": _nullable(columns["speed"])
+    }
+
+def decode_polyline(text, precision=5):
+    factor = 10 ** precision
+    points = []
+    index = lat = lng = 0
+    while index < len(text):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(text[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        points.append((lat / factor, lng / factor))
+    return points
+
+def pack(coordinates):
+    # Storage form, roughly 20 bytes per fix
+    columns = _columns(coordinates)
+    received = [c.get('receivedAt') or c['timestamp'] for c in coordinates]
+    return {
+        "format": "columnar-e6",
+        "count": len(coordinates),
+        "t0": coordinates[0]['timestamp'] if coordinates else None,
+        "t": Binary(columns["t"][1:].astype('<i4').tobytes()),
+        "lat0": int(columns["lat"][0]) if coordinates else 0,
+        "lng0": int(columns["lng"][0]) if coordinates else 0,
+        "lat": Binary(columns["lat"][1:].astype('<i4').tobytes()),
+        "lng": Binary(columns["lng"][1:].astype('<i4').tobytes()),
+        "accuracy": Binary(columns["accuracy"].tobytes()),
+        "speed": Binary(columns["speed"].tobytes()),
+        # Server receive times (SessionCoordinate cursors), deltas like t
+        "r0": received[0] if coordinates else None,
+        "r": Binary(np.diff(np.array([_millis(r) for r in received], dtype=np.int64)).astype('<i4').tobytes())
+    }
+
+def unpack(doc):
+    count = doc.get("count") or 0
+    if not count:
+        return []
+    t = np.concatenate(([_millis(doc["t0"])], np.frombuffer(doc["t"], dtype='<i4')))
+    lat = np.concatenate(([doc["lat0"]], np.frombuffer(doc["lat"], dtype='<i4')))
+    lng = np.concatenate(([doc["lng0"]], np.frombuffer(doc["lng"], dtype='<i4')))
+    accuracy = np.frombuffer(doc["accuracy"], dtype='<f4')
+    speed = np.frombuffer(doc["speed"], dtype='<f4')
+    # Archives packed before receive times were kept have no "r0"
+    received = None
+    if doc.get("r0") is not None:
+        received = np.cumsum(np.concatenate(([_millis(doc["r0"])], np.frombuffer(doc["r"], dtype='<i4'))))
+    return _rows(count, t, lat, lng, accuracy, speed, received)
@@ -0,0 +1,40 @@
+import math
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    # Great-circle distance in metres
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+def path_distance(coordinates, previous=None):
+    # Length of the polyline through the fixes, optionally continuing from
+    # the last fix already stored
+    points = ([previous] if previous else []) + list(coordinates)
+    total = 0.0
+    for a, b in zip(points, points[1:]):
+        total += haversine(a['latitude'], a['longitude'], b['latitude'], b['longitude'])
+    return total
+
+def bounding_box(coordinates):
+    lats = [c['latitude'] for c in coordinates]
+    lngs = [c['longitude'] for c in coordinates]
+    return {"minLat": min(lats), "maxLat": max(lats), "minLng": min(lngs), "maxLng": max(lngs)}
+
+def haversine_expression(lat_field, lng_field, lat, lng):
+    # Aggregation expression for the distance in metres from a stored point
+    # (field paths like "$lastLocation.latitude") to a known one, so pipeline
+    # updates can measure against the document's current state
+    phi1 = {"$degreesToRadians": lat_field}
+    phi2 = math.radians(lat)
+    half_dphi = {"$divide": [{"$subtract": [phi2, phi1]}, 2]}
+    half_dlmb = {"$divide": [{"$subtract": [math.radians(lng), {"$degreesToRadians": lng_field}]}, 2]}
+    a = {"$add": [
+        {"$pow": [{"$sin": half_dphi}, 2]},
+        {"$multiply": [{"$cos": phi1}, math.cos(phi2), {"$pow": [{"$sin": half_dlmb}, 2]}]}
+    ]}
+    return {"$multiply": [2 * EARTH_RADIUS_M, {"$asin": {"$min": [1, {"$sqrt": a}]}}]}
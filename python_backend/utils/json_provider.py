@@ -0,0 +1,66 @@
+import decimal
+import json
+import uuid
+from datetime import date, datetime
+from bson import ObjectId, Decimal128
+from flask.json.provider import JSONProvider
+from utils.timestamps import format_timestamp
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(o):
+    # Types the encoders don't know natively. Same output with and without
+    # orjson: ObjectId as its hex string, decimals as strings (no float
+    # rounding), datetimes as ISO-8601 UTC with a Z suffix.
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, Decimal128):
+        return str(o.to_decimal())
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if isinstance(o, datetime):
+        return format_timestamp(o)
+    if isinstance(o, date):
+        return o.isoformat()
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+class BSONJSONProvider(JSONProvider):
+    # app.json for create_app: jsonify/ApiResponse, streamed arrays, SSE
+    # frames and asgi.py all encode through it. Uses orjson when installed
+    # (C encoder, datetimes and UUIDs handled natively) and the json module
+    # otherwise.
+
+    sort_keys = True
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None:
+            option = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+            if kwargs.get('sort_keys', self.sort_keys):
+                option |= orjson.OPT_SORT_KEYS
+            if kwargs.get('indent'):
+                option |= orjson.OPT_INDENT_2
+            try:
+                return orjson.dumps(obj, default=_default, option=option).decode('utf-8')
+            except TypeError:
+                # Out of orjson's range (e.g. integers over 64 bits)
+                pass
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', False)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        kwargs.setdefault('separators', (',', ':'))
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps(obj) + '\n', mimetype=self.mimetype)
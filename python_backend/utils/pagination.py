@@ -0,0 +1,35 @@
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId
+
+
+# Opaque keyset cursors for lists sorted by (<field>, _id), descending for
+# history pages and ascending for coordinate cursors. The client only ever
+# echoes back the cursor value it was given. _id may be None (no tiebreak).
+
+def encode_cursor(value, _id):
+    payload = {"v": value.isoformat() if isinstance(value, datetime) else value, "id": str(_id) if _id else None}
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        value = payload['v']
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        return value, ObjectId(payload['id']) if payload['id'] else None
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def keyset_filter(field, value, _id, ascending=False):
+    # Everything strictly after (value, _id) in the given order
+    op = "$gt" if ascending else "$lt"
+    if _id is None:
+        return {field: {op: value}}
+    return {"$or": [
+        {field: {op: value}},
+        {field: value, "_id": {op: _id}}
+    ]}
@@ -0,0 +1,24 @@
+import bcrypt
+
+# Plain bcrypt helpers. With BCRYPT_POOL_SIZE set they run inside worker
+# processes (services.password_service), so this module stays free of app imports.
+
+def hash_password(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+def check_password(password, hashed):
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    except ValueError:
+        # Not a bcrypt hash
+        return False
+
+def is_hashed(value):
+    return isinstance(value, str) and len(value) == 60 and value.startswith(('$2a$', '$2b$', '$2y$'))
+
+def hash_rounds(hashed):
+    # Cost factor of a stored hash, e.g. 12 for "$2b$12$..."
+    try:
+        return int(hashed.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
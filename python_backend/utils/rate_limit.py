@@ -0,0 +1,82 @@
+import threading
+import time
+
+
+class TokenBucket:
+    # Thread-safe token bucket: `rate` tokens per second, bursts up to
+    # `capacity`. acquire() blocks until a token is free or the timeout passes.
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, max_wait=None):
+        # Takes a token, possibly one that only refills later, and returns how
+        # long the caller must wait before using it. Reservations are handed
+        # out in call order, so waiting callers go first-come first-served.
+        # Returns None, without reserving, if the wait would exceed max_wait.
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+    def acquire(self, timeout=None):
+        if self.rate <= 0:
+            return True
+        wait = self.reserve(timeout)
+        if wait is None:
+            return False
+        if wait:
+            time.sleep(wait)
+        return True
+
+
+class KeyedTokenBuckets:
+    # One TokenBucket per key (e.g. per sender number), created on first use
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity)
+            return bucket
+
+    def acquire(self, key, timeout=None):
+        return self.get(key).acquire(timeout)
+
+
+class SharedTokenBuckets:
+    # KeyedTokenBuckets whose state lives outside the process, so the rate
+    # holds across all workers. reserve(key, rate, capacity, max_wait) has
+    # the contract of TokenBucket.reserve() (models.RateLimit.reserve).
+
+    def __init__(self, reserve, rate, capacity=None):
+        self.reserve = reserve
+        self.rate = float(rate)
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+
+    def acquire(self, key, timeout=None):
+        if self.rate <= 0:
+            return True
+        wait = self.reserve(key, self.rate, self.capacity, timeout)
+        if wait is None:
+            return False
+        if wait:
+            time.sleep(wait)
+        return True
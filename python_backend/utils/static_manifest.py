@@ -0,0 +1,131 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from flask import request, send_file
+from werkzeug.exceptions import NotFound
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content hash in the file name (CRA: main.3f2c1a9b.js, logo.6ce24c58...svg);
+# such a URL never changes content, so it can be cached for good
+HASHED_NAME = re.compile(r'\.[0-9a-f]{8,}\.')
+COMPRESSIBLE = {'.html', '.js', '.css', '.json', '.map', '.svg', '.txt', '.ico', '.xml', '.webmanifest'}
+# (Accept-Encoding token, file suffix), in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+def _digest(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()[:20]
+
+def _accepted(header):
+    # Content codings the client accepts (q > 0)
+    accepted = set()
+    for part in (header or '').split(','):
+        token, _, params = part.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if token:
+            accepted.add(token.strip().lower())
+    return accepted
+
+class StaticManifest:
+    # The React build folder, read once when the app is created: request
+    # paths are looked up in memory instead of hitting the filesystem, and
+    # each file's ETag and .br/.gz variants are known up front. The build is
+    # part of the image, so a new build means a restart.
+
+    def __init__(self, root, max_age=3600, immutable_max_age=31536000):
+        self.root = root
+        self.max_age = max_age
+        self.immutable_max_age = immutable_max_age
+        self.files = {}
+        self.build()
+
+    def build(self):
+        files = {}
+        if os.path.isdir(self.root):
+            for directory, _, names in os.walk(self.root):
+                for name in names:
+                    full = os.path.join(directory, name)
+                    rel = os.path.relpath(full, self.root).replace(os.sep, '/')
+                    if any(rel.endswith(suffix) for _, suffix in ENCODINGS):
+                        continue
+                    files[rel] = {
+                        "path": full,
+                        "mimetype": mimetypes.guess_type(name)[0] or 'application/octet-stream',
+                        "etag": _digest(full),
+                        "immutable": bool(HASHED_NAME.search(name)),
+                        "encodings": {coding: full + suffix for coding, suffix in ENCODINGS if os.path.isfile(full + suffix)}
+                    }
+        self.files = files
+        return len(files)
+
+    def get(self, path):
+        return self.files.get(path)
+
+    def send(self, path):
+        # Response for a manifest path. Unknown paths get index.html (client
+        # side routes); 404 only when there's no build at all.
+        entry = self.files.get(path) or self.files.get('index.html')
+        if entry is None:
+            raise NotFound()
+
+        filename, etag, coding = entry["path"], entry["etag"], None
+        if entry["encodings"]:
+            accepted = _accepted(request.headers.get('Accept-Encoding'))
+            for candidate, _ in ENCODINGS:
+                if candidate in accepted and candidate in entry["encodings"]:
+                    coding = candidate
+                    filename = entry["encodings"][candidate]
+                    etag = f'{etag}-{candidate}'
+                    break
+
+        max_age = self.immutable_max_age if entry["immutable"] else self.max_age
+        response = send_file(filename, mimetype=entry["mimetype"], etag=etag, max_age=max_age, conditional=True)
+        if coding and response.status_code != 304:
+            response.headers['Content-Encoding'] = coding
+        if entry["encodings"]:
+            response.vary.add('Accept-Encoding')
+        if entry["immutable"]:
+            response.cache_control.immutable = True
+        elif entry is self.files.get('index.html'):
+            # Points at the current hashed bundles, so always revalidate
+            response.cache_control.no_cache = True
+            response.cache_control.max_age = 0
+        return response
+
+def precompress(root, min_size=1024, level=9):
+    # Writes .gz (and .br, with the brotli package) next to each text asset
+    # of the build, where it saves space. Run once after `npm run build`.
+    written = 0
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if os.path.splitext(name)[1] not in COMPRESSIBLE:
+                continue
+            full = os.path.join(directory, name)
+            with open(full, 'rb') as f:
+                data = f.read()
+            if len(data) < min_size:
+                continue
+            variants = {'.gz': gzip.compress(data, compresslevel=level, mtime=0)}
+            if brotli is not None:
+                variants['.br'] = brotli.compress(data, quality=11)
+            for suffix, compressed in variants.items():
+                if len(compressed) < len(data):
+                    with open(full + suffix, 'wb') as f:
+                        f.write(compressed)
+                    written += 1
+    return written
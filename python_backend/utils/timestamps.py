@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+
+def parse_timestamp(value, default=None):
+    # Accepts ISO-8601 strings, HTTP dates or epoch values (seconds or milliseconds).
+    # Returned datetimes are naive UTC to match what we store everywhere else.
+    if value is None or value == '':
+        return default
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        seconds = value / 1000.0 if value > 1e11 else float(value)
+        parsed = datetime.fromtimestamp(seconds, tz=timezone.utc)
+    elif isinstance(value, str):
+        text = value.strip()
+        if text.endswith('Z'):
+            text = text[:-1] + '+00:00'
+        try:
+            parsed = datetime.fromisoformat(text)
+        except ValueError:
+            try:
+                return parse_timestamp(float(text), default)
+            except ValueError:
+                pass
+            try:
+                # HTTP dates, the format Flask's default JSON encoder writes
+                parsed = parsedate_to_datetime(text)
+            except (TypeError, ValueError):
+                parsed = None
+            if parsed is None:
+                raise ValueError(f"Invalid timestamp: {value}")
+    else:
+        raise ValueError(f"Invalid timestamp: {value}")
+
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def format_timestamp(value):
+    # ISO-8601 as JSON responses write it (utils.json_provider, same as
+    # orjson): naive datetimes are UTC and get a Z suffix, aware ones keep
+    # their offset. parse_timestamp reads it back.
+    if value.tzinfo is None or value.utcoffset() == timedelta(0):
+        return value.replace(tzinfo=None).isoformat() + 'Z'
+    return value.isoformat()
@@ -0,0 +1,72 @@
+import math
+import numpy as np
+
+from .geo import EARTH_RADIUS_M
+
+# Douglas-Peucker track simplification for map rendering. Every fix gets an
+# importance (its distance from the simplified line at the moment DP would
+# split there, capped by its parent's), so one ranking answers both "keep
+# everything further than `tolerance` metres off" and "keep the best
+# `max_points`". Start and end are always kept.
+
+
+def _project(coordinates):
+    # Local equirectangular projection in metres, accurate enough at the scale
+    # of one track
+    lat = np.radians(np.array([c['latitude'] for c in coordinates], dtype=float))
+    lng = np.radians(np.array([c['longitude'] for c in coordinates], dtype=float))
+    x = EARTH_RADIUS_M * lng * math.cos(float(lat.mean()))
+    y = EARTH_RADIUS_M * lat
+    return x, y
+
+def _segment_distances(x, y, start, end):
+    # Distance of points start+1..end-1 from the segment start-end
+    px, py = x[start + 1:end], y[start + 1:end]
+    ax, ay = x[start], y[start]
+    dx, dy = x[end] - ax, y[end] - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return np.hypot(px - ax, py - ay)
+    t = np.clip(((px - ax) * dx + (py - ay) * dy) / length_sq, 0.0, 1.0)
+    return np.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+def importance(coordinates):
+    n = len(coordinates)
+    ranks = np.zeros(n)
+    if n == 0:
+        return ranks
+    ranks[0] = ranks[-1] = np.inf
+    if n < 3:
+        return ranks
+
+    x, y = _project(coordinates)
+    stack = [(0, n - 1, np.inf)]
+    while stack:
+        start, end, parent = stack.pop()
+        if end - start < 2:
+            continue
+        distances = _segment_distances(x, y, start, end)
+        offset = int(np.argmax(distances))
+        split = start + 1 + offset
+        rank = min(float(distances[offset]), parent)
+        ranks[split] = rank
+        stack.append((start, split, rank))
+        stack.append((split, end, rank))
+    return ranks
+
+def simplify(coordinates, tolerance=None, max_points=None):
+    # Returns the kept fixes in their original order
+    coordinates = list(coordinates)
+    if len(coordinates) < 3 or (tolerance is None and max_points is None):
+        return coordinates
+
+    ranks = importance(coordinates)
+    keep = np.ones(len(coordinates), dtype=bool)
+    if tolerance is not None:
+        keep &= ranks > tolerance
+    if max_points is not None and keep.sum() > max_points:
+        # Highest ranks first; stable so ties keep the earlier fix
+        order = np.argsort(-np.where(keep, ranks, -1.0), kind='stable')
+        keep = np.zeros(len(coordinates), dtype=bool)
+        keep[order[:max(max_points, 2)]] = True
+    return [c for c, kept in zip(coordinates, keep) if kept]
@@ -13,6 +13,7 @@ from .device_validation import (
 from .session_validation import (
     StartTriggerSchema as SessionStartTriggerSchema,
     AddCoordinatesSchema as SessionAddCoordinatesSchema,
+    AddCoordinatesBatchSchema as SessionAddCoordinatesBatchSchema,
     StopTriggerSchema as SessionStopTriggerSchema
 )
 from .user_validation import ChangePasswordSchema
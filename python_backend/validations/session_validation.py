@@ -17,6 +17,13 @@ class AddCoordinatesSchema(Schema):
     accuracy = fields.Float(validate=validate.Range(min=0))
     speed = fields.Float(validate=validate.Range(min=0))
 
+class TimestampedCoordinateSchema(CoordinateSchema):
+    timestamp = fields.Raw()
+
+class AddCoordinatesBatchSchema(Schema):
+    deviceId = fields.String(required=True)
+    coordinates = fields.List(fields.Nested(TimestampedCoordinateSchema), required=True, validate=validate.Length(min=1))
+
 class StopTriggerSchema(Schema):
     deviceId = fields.String(required=True)
     manualStop = fields.Boolean(load_default=True)